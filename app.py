@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
 # from args import args
 import pymongo # type: ignore
+from pymongo import WriteConcern, IndexModel, InsertOne, UpdateOne, UpdateMany, DeleteOne, DeleteMany # type: ignore
 from datetime import datetime
 import random
 import string
+import os
 import bson # type: ignore
+from bson.raw_bson import RawBSONDocument # type: ignore
 from faker import Faker # type: ignore
 from customProvider import CustomProvider # Custom providers
 import time
 import threading
+import itertools
+import struct
+import functools
+import queue
 import logging
 import textwrap
 import pprint
@@ -17,8 +24,9 @@ import sys
 import re
 from urllib.parse import urlencode  # Properly format URL parameters
 from multiprocessing import Lock
+from multiprocessing import shared_memory
 from mongodbCreds import dbconfig 
-from mongo_client import get_client
+from mongo_client import get_client, get_collection, get_raw_collection
 import args as args_module
 
 
@@ -37,22 +45,149 @@ import mongodbLoadQueries
 # Initialize a lock for logging
 log_lock = Lock()
 
-fake = Faker()
-fake.add_provider(CustomProvider) # Add our custom providers
+#####################################################################
+# Per-thread state. Each worker thread gets its own Faker instance
+# (seeded per thread) and its own compiled schema caches, so threads
+# never share provider state
+#####################################################################
+_thread_state = threading.local()
+
+def get_fake():
+    fake = getattr(_thread_state, "fake", None)
+    if fake is None:
+        fake = Faker()
+        fake.add_provider(CustomProvider) # Add our custom providers
+        fake.seed_instance(os.getpid() ^ threading.get_ident())
+        _thread_state.fake = fake
+    return fake
+
+def _thread_cache(name):
+    cache = getattr(_thread_state, name, None)
+    if cache is None:
+        cache = {}
+        setattr(_thread_state, name, cache)
+    return cache
+
+#####################################################################
+# Lock-free operation counter. Each worker thread only ever increments
+# its own cell, so the CRUD hot path never contends on a lock. Readers
+# sum the cells, which gives a slightly stale but consistent-enough view
+#####################################################################
+class ThreadCounter:
+    def __init__(self):
+        self._local = threading.local()
+        self._cells = []
+
+    def add(self, n=1):
+        try:
+            self._local.cell[0] += n
+        except AttributeError:
+            # First add from this thread: register its cell
+            cell = self._local.cell = [n]
+            self._cells.append(cell)  # list.append is atomic under the GIL
+
+    @property
+    def value(self):
+        return sum(cell[0] for cell in self._cells)
+
+#####################################################################
+# Fixed-size ring of recently inserted primary keys per collection.
+# Memory stays bounded no matter how long the workload runs, and
+# sampling is a single list index instead of a scan of a growing list
+#####################################################################
+PK_CACHE_BITS = 13
+PK_CACHE_SIZE = 1 << PK_CACHE_BITS  # Max primary key values remembered per collection (8192, a power of two)
+
+class PrimaryKeyBuffer:
+    def __init__(self, capacity=PK_CACHE_SIZE):
+        self._capacity = capacity
+        self._bits = capacity.bit_length() - 1 if capacity & (capacity - 1) == 0 else None
+        self._slots = [None] * capacity
+        self._positions = itertools.count()  # next() is atomic, so concurrent writers never share a slot
+        self._index = {}  # value -> slot, so remove() doesn't scan the ring
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, values):
+        index = self._index
+        for value in values:
+            pos = next(self._positions)
+            slot = pos % self._capacity
+            old = self._slots[slot]
+            # pop rather than del: a worker's remove() may drop the key between the check and here
+            if old is not None and index.get(old) == slot:
+                index.pop(old, None)
+            self._slots[slot] = value
+            index[value] = slot
+            if self._size < self._capacity:
+                self._size = min(pos + 1, self._capacity)
+
+    def sample(self):
+        # Returns None while empty (or if the chosen slot was just cleared)
+        if not self._size:
+            return None
+        # Once full, a power-of-two buffer is indexed directly with random bits (no float math)
+        if self._size == self._capacity and self._bits is not None:
+            return self._slots[random.getrandbits(self._bits)]
+        return self._slots[random.randrange(self._size)]
+
+    def remove(self, value):
+        slot = self._index.pop(value, None)
+        # The slot may have been reused since; only clear it if it still holds the value
+        if slot is not None and self._slots[slot] == value:
+            self._slots[slot] = None
+
+#####################################################################
+# Counts down as worker threads exit; `done` is set once all of them
+# have, so the reporter can wait on it instead of polling is_alive()
+#####################################################################
+class CountdownLatch:
+    def __init__(self, count):
+        self._count = count
+        self._lock = threading.Lock()
+        self.done = threading.Event()
+        if count <= 0:
+            self.done.set()
+
+    def count_down(self):
+        with self._lock:
+            self._count -= 1
+            if self._count <= 0:
+                self.done.set()
+
+def run_worker(workers_latch, target_worker, worker_args):
+    try:
+        target_worker(*worker_args)
+    finally:
+        workers_latch.count_down()
 
 process_id = 0
-insert_count = 0
-update_count = 0
-delete_count = 0
-select_count = 0
+insert_count = ThreadCounter()
+update_count = ThreadCounter()
+delete_count = ThreadCounter()
+select_count = ThreadCounter()
 collection_primary_keys = {}       # (db, collection) primary key field
-inserted_primary_keys = {}        # (db, collection) list of primary key values
+inserted_primary_keys = {}        # (db, collection) PrimaryKeyBuffer of primary key values
 collection_shard_metadata = {}
-docs_deleted = 0
-docs_inserted = 0
-docs_updated = 0
-docs_selected = 0
-lock = threading.Lock()
+docs_deleted = ThreadCounter()
+docs_inserted = ThreadCounter()
+docs_updated = ThreadCounter()
+docs_selected = ThreadCounter()
+
+# op_type -> (operation counter, documents counter), so one lookup records both
+_OP_COUNTERS = {
+    "select": (select_count, docs_selected),
+    "insert": (insert_count, docs_inserted),
+    "update": (update_count, docs_updated),
+    "delete": (delete_count, docs_deleted),
+}
+
+def record_op(op_type, op_count, docs_affected):
+    op_counter, docs_counter = _OP_COUNTERS[op_type]
+    op_counter.add(op_count)
+    docs_counter.add(docs_affected)
 
 def handle_exit(signum, frame):
     """Handle Ctrl+C gracefully by signaling threads to stop."""
@@ -62,10 +197,10 @@ def handle_exit(signum, frame):
 
 letters = string.ascii_lowercase
 def random_string(max_length):
-    return ''.join(random.choice(letters) for _ in range(max_length))
+    return ''.join(random.choices(letters, k=max_length))
 
 def generate_aircraft_context():
-    plane_type, total_seats, num_passengers, seats_available = fake.aircraft_and_seats()
+    plane_type, total_seats, num_passengers, seats_available = get_fake().aircraft_and_seats()
     return {
         "plane_type": plane_type,
         "total_seats": total_seats,
@@ -73,6 +208,18 @@ def generate_aircraft_context():
         "seats_available": seats_available
     }
 
+# Batch form of generate_aircraft_context, one context per document of an insert batch
+def generate_aircraft_contexts(n):
+    return [
+        {
+            "plane_type": plane_type,
+            "total_seats": total_seats,
+            "num_passengers": num_passengers,
+            "seats_available": seats_available
+        }
+        for plane_type, total_seats, num_passengers, seats_available in get_fake().aircraft_and_seats_batch(n)
+    ]
+
 def requires_aircraft_context(field_schema):
     needed_methods = {"passengers", "equip", "total_seats", "seats_available"}
     for props in field_schema.values():
@@ -88,14 +235,8 @@ def requires_aircraft_context(field_schema):
 # Function to prepend shard key to each index if not already included
 ######################################################################
 def prepend_shard_key_to_index(index_keys, shard_key):
-    updated_keys = []
-    for sk_field, sk_order in shard_key.items():
-        updated_keys.append((sk_field, sk_order))
-
-    for field, order in index_keys.items():
-        if field not in shard_key:
-            updated_keys.append((field, order))
-    return updated_keys
+    # Shard key fields first (keeping their order/direction), then the remaining index fields
+    return list({**shard_key, **{k: v for k, v in index_keys.items() if k not in shard_key}}.items())
 
 ###################################################
 # Function to find out the collection's primary key
@@ -125,10 +266,9 @@ def get_primary_key_from_collection(coll):
 # Inspects the collection being used and adds to a list the following
 # - Whether it is sharded
 # - What the shard keys are (if sharded)
+# Entries are only ever added, so metadata for other collections is kept
 #####################################################################
 def collect_shard_key_metadata(random_db,random_collection):
-    global collection_shard_metadata  
-    collection_shard_metadata = {}   
     client = get_client()
     db = client[random_db]
     
@@ -151,12 +291,19 @@ def collect_shard_key_metadata(random_db,random_collection):
         # Store in global metadata dictionary
         collection_shard_metadata[(random_db, random_collection)] = {
             "sharded": is_sharded,
-            "shard_keys": shard_keys
+            "shard_keys": shard_keys,
+            "shard_keys_fs": frozenset(shard_keys)
         }
 
     except pymongo.errors.PyMongoError as e:
         logging.error(f"Error retrieving shard metadata for {ns}: {e}")
 
+# Load the shard metadata of every workload collection up front so the CRUD functions only read
+# collection_shard_metadata. Worker processes don't share the parent's globals, so each one loads its own copy
+def preload_shard_key_metadata(created_collections):
+    for db_name, collection_name in created_collections:
+        collect_shard_key_metadata(db_name, collection_name)
+
 
 ####################
 # Create collections
@@ -169,13 +316,13 @@ def create_collection(collection_def, collections=1, recreate=False):
     if isinstance(collection_def, dict):
         collection_def = [collection_def]
 
+    client = get_client()
     for entry in collection_def:
         base_collection_name = entry["collectionName"]
         db_name = entry["databaseName"]
         indexes = entry.get("indexes", [])
         shard_config = entry.get("shardConfig")
 
-        client = get_client()
         db = client[db_name]
 
         for i in range(1, collections + 1):
@@ -183,17 +330,28 @@ def create_collection(collection_def, collections=1, recreate=False):
             collection = db[collection_name]
 
             try:
-                if recreate and collection_name in db.list_collection_names():
+                # drop() is a no-op for a missing collection
+                if recreate:
                     collection.drop()
 
-                if collection_name not in db.list_collection_names():
-                    db.create_collection(collection_name)
+                # Attempt the create directly instead of listing collections first; an existing
+                # collection comes back as NamespaceExists (code 48) and is left untouched
+                try:
+                    db.create_collection(collection_name, check_exists=False)
+                    created = True
+                except pymongo.errors.OperationFailure as e:
+                    if e.code != 48:
+                        raise
+                    created = False
+
+                if created:
                     logging.info(f"Collection '{collection_name}' created in DB '{db_name}'")
 
                     if not dbconfig.get("replicaSet") and shard_config:
                         shard_collection(db_name, collection_name, shard_config)
 
                     primary_key_field = None
+                    index_models = []
                     for index in indexes:
                         index_keys = index["keys"]
                         options = index.get("options", {})
@@ -203,12 +361,26 @@ def create_collection(collection_def, collections=1, recreate=False):
                         if options.get("unique", False) and keys and not primary_key_field:
                             primary_key_field = keys[0][0]
 
-                        # logging.info(f"Creating index on {collection_name} with keys={keys}, options={options}")
+                        # A bad option in the collection JSON only skips that index, like a failed build would
+                        try:
+                            index_models.append(IndexModel(keys, **options))
+                        except (TypeError, pymongo.errors.PyMongoError) as e:
+                            logging.error(f"Invalid index definition {keys} for {collection_name}, skipped: {e}")
+
+                    # Build all indexes in a single createIndexes command. If the batch fails, retry
+                    # them one at a time so a single bad definition doesn't block the others
+                    if index_models:
                         try:
-                            index_name = collection.create_index(keys, **options)
-                            logging.info(f"Successfully created index: '{index_name}'")
-                        except Exception as e:
-                            logging.error(f"Failed to create index {keys} on {collection_name}: {e}")
+                            for index_name in collection.create_indexes(index_models):
+                                logging.info(f"Successfully created index: '{index_name}'")
+                        except pymongo.errors.PyMongoError:
+                            for model in index_models:
+                                keys = list(model.document["key"].items())
+                                try:
+                                    index_name = collection.create_indexes([model])[0]
+                                    logging.info(f"Successfully created index: '{index_name}'")
+                                except pymongo.errors.PyMongoError as e:
+                                    logging.error(f"Failed to create index {keys} on {collection_name}: {e}")
 
                     if not primary_key_field:
                         primary_key_field = "_id"
@@ -219,6 +391,7 @@ def create_collection(collection_def, collections=1, recreate=False):
             except pymongo.errors.PyMongoError as e:
                         logging.error(f"Error creating collection '{collection_name}': {e}")
 
+    preload_shard_key_metadata(created_collections)
     return created_collections
 
 ###################
@@ -238,171 +411,496 @@ def shard_collection(db_name, collection_name, shard_config):
 ########################
 # Random value generator
 ########################
+# One generator per BSON type string, looked up with a single dict access.
+# Built once per thread around that thread's Faker instance
+def _build_value_generators(fake):
+    return {
+        "string": fake.word,
+        "int": functools.partial(random.randint, 1, 10000),
+        "double": lambda: round(random.uniform(10.0, 10000.0), 2),
+        "bool": lambda: random.choice((True, False)),
+        "date": fake.date_time,
+        "objectId": bson.ObjectId,
+        # This is the generic fallback for an array
+        "array": lambda: [fake.word() for _ in range(random.randint(1, 3))],
+        # This is the generic fallback for an object
+        "object": lambda: {"randomKey": fake.word()},
+        "timestamp": datetime.utcnow,
+        "long": functools.partial(random.randint, 10000000000, 99999999999),
+        "decimal": lambda: bson.Decimal128(str(round(random.uniform(0.1, 9999.99), 2))),
+    }
+
+def _value_generators():
+    generators = getattr(_thread_state, "value_generators", None)
+    if generators is None:
+        generators = _thread_state.value_generators = _build_value_generators(get_fake())
+    return generators
+
 def generate_random_value(type_val):
     """A simple helper to generate a random value based on a BSON type string."""
-    match type_val:
-        case "string":
-            return fake.word()
-        case "int":
-            return random.randint(1, 10000)
-        case "double":
-            return round(random.uniform(10.0, 10000.0), 2)
-        case "bool":
-            return random.choice([True, False])
-        case "date":
-            return fake.date_time()
-        case "objectId":
-            return bson.ObjectId()
-        case "array":
-            # This is the generic fallback for an array
-            return [fake.word() for _ in range(random.randint(1, 3))]
-        case "object":
-            # This is the generic fallback for an object
-            return {"randomKey": fake.word()}
-        case "timestamp":
-            return datetime.utcnow()
-        case "long":
-            return random.randint(10000000000, 99999999999)
-        case "decimal":
-            return bson.Decimal128(str(round(random.uniform(0.1, 9999.99), 2)))
-        case _:
-            return None
+    gen = _value_generators().get(type_val)
+    return gen() if gen else None
 
-##################################################
-# Create random data based on datatype an provider
-##################################################
-def generate_random_document(field_schema, context=None):
-    doc = {}
-    context = context or {}
+#####################################################################
+# Column generators: produce a whole batch of values for a plain
+# type in one call, matching what generate_random_value would return
+#####################################################################
+_INT_VALUES = range(1, 10001)
+_LONG_VALUES = range(10000000000, 100000000000)
+_BOOL_VALUES = (True, False)
+
+def _double_column(n):
+    _random = random.random
+    return [round(10.0 + 9990.0 * _random(), 2) for _ in range(n)]
+
+def _object_id_column(n):
+    # Mint the batch from a single template the same way the driver does: timestamp,
+    # then 5 random bytes (fresh per batch so batches can't collide), then a 3 byte counter
+    prefix = int(time.time()).to_bytes(4, "big") + os.urandom(5)
+    return [bson.ObjectId(prefix + (i & 0xFFFFFF).to_bytes(3, "big")) for i in range(n)]
+
+def _timestamp_column(n):
+    # One clock read per batch; every document in the batch shares the same timestamp
+    return [datetime.utcnow()] * n
+
+_COLUMN_GENERATORS = {
+    "int": lambda n: random.choices(_INT_VALUES, k=n),
+    "long": lambda n: random.choices(_LONG_VALUES, k=n),
+    "bool": lambda n: random.choices(_BOOL_VALUES, k=n),
+    "double": _double_column,
+    "objectId": _object_id_column,
+    "timestamp": _timestamp_column,
+}
 
+#####################################################################
+# Compile a field schema into a list of (field, generator, column
+# generator) entries once, so batches of documents can be built without
+# re-dispatching on the provider and type of every field for every
+# document. Plain typed fields, and providers with a "_column" form,
+# also get a column generator that produces the whole batch at once
+#####################################################################
+# Plans are cached per thread (see _thread_cache) as id(field_schema) -> [(field, gen(context), column_gen(n) or None)]
+_CONTEXT_PROVIDERS = ("passengers", "equip", "total_seats", "seats_available")
+
+# equip only depends on the aircraft, so each of the few possible subdocuments is encoded to BSON once
+# and inserted as raw bytes. RawBSONDocument is immutable, so sharing it between threads and documents is safe
+@functools.lru_cache(maxsize=256)
+def _cached_equip(plane_type, total_seats):
+    return RawBSONDocument(bson.encode(get_fake().equip(plane_type, total_seats)))
+
+# Resolve a provider name to a generator taking the aircraft context, or None if fake doesn't have it
+def _resolve_provider(provider):
+    fake = get_fake()
+    # Context-aware providers read the per-document aircraft context
+    if provider == "passengers":
+        return lambda ctx: fake.passengers(
+            total_seats=ctx.get("total_seats", 100),
+            num_passengers=ctx.get("num_passengers", 10),
+            fake=fake
+        )
+    elif provider == "equip":
+        return lambda ctx: _cached_equip(ctx.get("plane_type", "Airbus A320"), ctx.get("total_seats", 100))
+    elif provider == "total_seats":
+        return lambda ctx: str(ctx.get("total_seats", 100))
+    elif provider == "seats_available":
+        return lambda ctx: ctx.get("seats_available", 0)
+
+    provider_func = getattr(fake, provider, None)
+    if callable(provider_func):
+        return lambda ctx, func=provider_func: func()
+    return None
+
+def _type_generator(bson_type):
+    value_gen = _value_generators().get(bson_type)
+    return (lambda ctx, func=value_gen: func()) if value_gen else (lambda ctx: None)
+
+def _compile_plan(field_schema):
+    field_plans = _thread_cache("field_plans")
+    plan = field_plans.get(id(field_schema))
+    if plan is not None:
+        return plan
+
+    plan = []
     for field, props in field_schema.items():
         provider = props.get("provider")
-        
-        # 1. Prioritize using the provider if it's defined in the schema
+
         if provider:
-            # Handle special context-aware providers from your original code
-            if provider == "passengers":
-                doc[field] = fake.passengers(
-                    total_seats=context.get("total_seats", 100),
-                    num_passengers=context.get("num_passengers", 10),
-                    fake=fake
-                )
-            elif provider == "equip":
-                doc[field] = fake.equip(
-                    context.get("plane_type", "Airbus A320"),
-                    context.get("total_seats", 100)
-                )
-            elif provider == "total_seats":
-                doc[field] = str(context.get("total_seats", 100))
-            elif provider == "seats_available":
-                doc[field] = context.get("seats_available", 0)
-            
-            # Handle all other normal providers (like drivers, rental_info, etc.)
-            else:
-                provider_func = getattr(fake, provider, None)
-                if callable(provider_func):
-                    doc[field] = provider_func()
-                else:
-                    logging.warning(f"Provider '{provider}' not found for field '{field}'.")
-                    doc[field] = None
-        
-        # 2. If NO provider is specified, fall back to the basic type
+            gen = _resolve_provider(provider)
+            if gen is None:
+                logging.warning(f"Provider '{provider}' not found for field '{field}'.")
+                gen = lambda ctx: None
+        else:
+            gen = _type_generator(props.get("type", "string"))
+
+        if provider:
+            # Providers may offer a batch form as "<provider>_column(n)" (see CustomProvider)
+            column_gen = getattr(get_fake(), f"{provider}_column", None) if provider not in _CONTEXT_PROVIDERS else None
         else:
-            bson_type = props.get("type", "string")
-            doc[field] = generate_random_value(bson_type)
+            column_gen = _COLUMN_GENERATORS.get(props.get("type", "string"))
+        plan.append((field, gen, column_gen))
+
+    field_plans[id(field_schema)] = plan
+    return plan
 
-    # Add a final safety check for context fields that might not have a provider
-    if "seats_available" in field_schema and "seats_available" not in doc:
-        doc["seats_available"] = context.get("seats_available", 0)
+#####################################################################
+# Turn a compiled plan into a specialized batch factory with exec, e.g.
+#   def _make(contexts):
+#       n = len(contexts)
+#       c0 = _c0(n)
+#       return [{'flight_id': c0[i], 'origin': _g1(ctx)} for i, ctx in enumerate(contexts)]
+# so building a batch is a single comprehension with the field names
+# as constants, instead of transposing columns with zip/dict per doc
+#####################################################################
+# Factories are cached per thread as id(field_schema) -> _make(contexts)
+
+def _compile_doc_factory(field_schema):
+    doc_factories = _thread_cache("doc_factories")
+    factory = doc_factories.get(id(field_schema))
+    if factory is not None:
+        return factory
+
+    namespace = {}
+    column_lines = []
+    entries = []
+    for i, (field, gen, column_gen) in enumerate(_compile_plan(field_schema)):
+        if column_gen:
+            namespace[f"_c{i}"] = column_gen
+            column_lines.append(f"    c{i} = _c{i}(n)")
+            entries.append(f"{field!r}: c{i}[i]")
+        else:
+            namespace[f"_g{i}"] = gen
+            entries.append(f"{field!r}: _g{i}(ctx)")
+
+    source = "\n".join([
+        "def _make(contexts):",
+        "    n = len(contexts)",
+        *column_lines,
+        f"    return [{{{', '.join(entries)}}} for i, ctx in enumerate(contexts)]",
+    ])
+    exec(compile(source, f"<doc factory {len(entries)} fields>", "exec"), namespace)
+
+    factory = doc_factories[id(field_schema)] = namespace["_make"]
+    return factory
+
+# Same as _compile_plan but for updates: skips the primary key, keeps each field's type for
+# update_queries, and falls back to the field type when a provider is missing
+def _compile_update_plan(field_schema, primary_key):
+    plan = []
+    for field, props in field_schema.items():
+        if field == primary_key:
+            continue
+        provider = props.get("provider")
+        ftype = props.get("type", "string")
 
-    return doc
+        gen = _resolve_provider(provider) if provider else None
+        if gen is None:
+            if provider:
+                logging.warning(f"Update: Provider '{provider}' not found or not callable on 'fake' object for field '{field}'. Falling back to generic type '{ftype}'.")
+            gen = _type_generator(ftype)
+
+        plan.append((field, gen, ftype, provider in _CONTEXT_PROVIDERS))
+    return plan
+
+#####################################################################
+# Per-collection schema metadata. Resolved once per process on first
+# use (worker processes don't share the parent's globals) and reused
+# by every CRUD call instead of re-scanning collection_def each time
+#####################################################################
+# Cached per thread as (db, base_collection) -> schema metadata, since the plans it holds use the thread's Faker
+
+def get_collection_meta(collection_def, db_name, base_collection):
+    coll_meta = _thread_cache("coll_meta")
+    meta = coll_meta.get((db_name, base_collection))
+    if meta is not None:
+        return meta
+
+    coll_entry = next(
+        (item for item in collection_def
+         if item.get("databaseName") == db_name and item.get("collectionName") == base_collection),
+        None
+    )
+    if not coll_entry:
+        return None
+
+    field_schema = coll_entry.get("fieldName", {})
+    primary_key = get_primary_key_from_collection(coll_entry)
+    meta = {
+        "field_schema": field_schema,
+        "primary_key": primary_key,
+        "primary_key_type": field_schema.get(primary_key, {}).get("type", "string"),
+        "need_context": requires_aircraft_context(field_schema),
+        "plan": _compile_plan(field_schema),
+        "factory": _compile_doc_factory(field_schema),
+        "update_plan": _compile_update_plan(field_schema, primary_key),
+    }
+    coll_meta[(db_name, base_collection)] = meta
+    return meta
 
 ################
 # CRUD Functions
 ################
 
+# Log an error at most once per ERROR_LOG_INTERVAL seconds per thread and key, so a burst of
+# failing operations doesn't serialize every worker on the logging handler. Suppressed errors are counted
+ERROR_LOG_INTERVAL = 1.0
+
+def log_error_rate_limited(key, msg, *msg_args):
+    last_logged = _thread_cache("error_log_times")
+    now = time.monotonic()
+    logged_at, suppressed = last_logged.get(key, (0.0, 0))
+    if now - logged_at < ERROR_LOG_INTERVAL:
+        last_logged[key] = (logged_at, suppressed + 1)
+        return
+    if suppressed:
+        msg += f" ({suppressed} similar errors suppressed)"
+    logging.error(msg, *msg_args)
+    last_logged[key] = (now, 0)
+
+# Pick a previously inserted primary key for the collection, or None if there isn't one yet
+def sample_primary_key(random_db, random_collection):
+    pk_buffer = inserted_primary_keys.get((random_db, random_collection))
+    return pk_buffer.sample() if pk_buffer is not None else None
+
+#####################################################################
+# Insert bookkeeping aggregator. Workers only put their batch results
+# on the queue; this single consumer thread updates the insert counters
+# and primary key buffers, so none of that happens on the insert path
+#####################################################################
+insert_results = queue.SimpleQueue()
+
+def insert_aggregator():
+    while True:
+        item = insert_results.get()
+        if item is None:  # Sentinel sent at shutdown
+            break
+        # A bad batch is logged and skipped; letting it escape would stop all insert counting for the run
+        try:
+            key, inserted, pk_values = item
+            insert_count.add()
+            docs_inserted.add(inserted)
+
+            pk_buffer = inserted_primary_keys.get(key)
+            if pk_buffer is None:
+                pk_buffer = inserted_primary_keys[key] = PrimaryKeyBuffer()
+            pk_buffer.extend(pk_values)
+        except Exception as e:
+            logging.error(f"Error recording insert results: {e}")
+
+#####################################################################
+# Client-side bulk writes (--bulk_write_size, pymongo 4.9+ and MongoDB
+# 8.0+). Each thread buffers its insert/update/delete models across all
+# collections and sends them in a single MongoClient.bulk_write call.
+# Servers older than 8.0 get one unordered Collection.bulk_write per
+# collection in the buffer instead. Callbacks run after a successful
+# flush for bookkeeping that depends on the write having happened
+# (PK caches, insert counters)
+#####################################################################
+_bulk_writes = threading.local()
+BULK_WRITE_MAX_AGE = 0.1  # Seconds a buffered write may wait before the batch is sent even if it isn't full
+
+def queue_bulk_write(args, op_type, namespace, models, on_success=None):
+    pending = getattr(_bulk_writes, "pending", None)
+    if pending is None:
+        pending = _bulk_writes.pending = {"models": [], "by_namespace": {}, "ops": {"insert": 0, "update": 0, "delete": 0},
+                                          "callbacks": [], "verbose": False, "started": time.monotonic()}
+
+    if on_success:
+        # Called with the per-operation result of the first model, when one is available (see flush_bulk_writes)
+        pending["callbacks"].append((len(pending["models"]), on_success))
+        # Delete callbacks need to know whether their delete matched, which takes verbose results
+        if op_type == "delete":
+            pending["verbose"] = True
+    pending["models"].extend(models)
+    pending["by_namespace"].setdefault(namespace, []).extend(models)
+    pending["ops"][op_type] += 1
+
+    # Flush on size, or on age so low write ratios don't hold writes (and their counters) back for long
+    if len(pending["models"]) >= args.bulk_write_size or time.monotonic() - pending["started"] >= BULK_WRITE_MAX_AGE:
+        flush_bulk_writes()
+
+def flush_stale_bulk_writes():
+    # Called by the workers before each operation, so a buffer is also sent on age while the thread is
+    # busy with reads and not queueing any new writes
+    pending = getattr(_bulk_writes, "pending", None)
+    if pending and time.monotonic() - pending["started"] >= BULK_WRITE_MAX_AGE:
+        flush_bulk_writes()
+
+client_bulk_write_supported = True  # Cleared for the process the first time the server rejects a client bulk write
+
+# Send the buffered models grouped by namespace, one unordered Collection.bulk_write per collection.
+# Collection.bulk_write ignores the models' namespace, so the same models can be reused as-is
+def collection_bulk_writes(by_namespace):
+    modified_count = deleted_count = 0
+    for namespace, namespace_models in by_namespace.items():
+        db_name, collection_name = namespace.split(".", 1)
+        result = get_collection(db_name, collection_name).bulk_write(namespace_models, ordered=False)
+        modified_count += result.modified_count
+        deleted_count += result.deleted_count
+    return modified_count, deleted_count
+
+def flush_bulk_writes():
+    pending = getattr(_bulk_writes, "pending", None)
+    if not pending or not pending["models"]:
+        return
+    models, ops, callbacks = pending["models"], pending["ops"], pending["callbacks"]
+    _bulk_writes.pending = None
+
+    global client_bulk_write_supported
+    # Per-operation delete results, by model index. Only client bulk writes report them
+    delete_results = {}
+    try:
+        if client_bulk_write_supported:
+            try:
+                result = get_client().bulk_write(models, ordered=False, verbose_results=pending["verbose"])
+                modified_count, deleted_count = result.modified_count, result.deleted_count
+                if pending["verbose"]:
+                    delete_results = result.delete_results
+            except pymongo.errors.InvalidOperation:
+                # Raised before anything is sent when the server is older than 8.0
+                client_bulk_write_supported = False
+                logging.info("Server does not support client bulk writes (MongoDB 8.0+), using one bulk write per collection.")
+        if not client_bulk_write_supported:
+            modified_count, deleted_count = collection_bulk_writes(pending["by_namespace"])
+    except pymongo.errors.PyMongoError as e:
+        logging.error(f"Error running bulk write of {len(models)} operations: {e}")
+        return
+
+    # Inserts are counted by the aggregator through their callbacks
+    update_count.add(ops["update"])
+    docs_updated.add(modified_count)
+    delete_count.add(ops["delete"])
+    docs_deleted.add(deleted_count)
+    for index, callback in callbacks:
+        callback(delete_results.get(index))
+
 ##############
 # Insert Docs
 ##############
+# Schemas without context-aware providers share one read-only empty context per batch size
+@functools.lru_cache(maxsize=None)
+def _empty_contexts(batch_size):
+    return ({},) * batch_size
+
+# With --fast_insert batches are sent unacknowledged (w=0) so workers don't wait on the server
+UNACKNOWLEDGED = WriteConcern(w=0)
+
 def insert_documents(args,base_collection, random_db, random_collection, collection_def, batch_size=10):
-    global insert_count, docs_inserted, inserted_primary_keys, collection_primary_keys
+    global collection_primary_keys
 
-    documents = []
-    collection = get_client()[random_db][random_collection]
+    write_concern = UNACKNOWLEDGED if args.fast_insert else None
+    collection = get_client()[random_db].get_collection(random_collection, write_concern=write_concern)
 
-    coll_entry = next(
-        (item for item in collection_def
-         if item.get("databaseName") == random_db and item.get("collectionName") == base_collection),
-        None
-    )
-    if not coll_entry:
+    meta = get_collection_meta(collection_def, random_db, base_collection)
+    if not meta:
         logging.error(f"No schema definition found for {random_db}.{base_collection}")
         return
 
-    field_schema = coll_entry.get("fieldName", {})
-    primary_key = get_primary_key_from_collection(coll_entry)
+    field_schema = meta["field_schema"]
+    primary_key = meta["primary_key"]
     collection_primary_keys[(random_db, random_collection)] = primary_key
 
-    need_context = requires_aircraft_context(field_schema)
+    # Each document gets its own aircraft so seats/passengers stay consistent within a document
+    if meta["need_context"]:
+        contexts = generate_aircraft_contexts(batch_size)
+    else:
+        contexts = _empty_contexts(batch_size)
 
-    for _ in range(batch_size):
-        context = generate_aircraft_context() if need_context else {}
-        doc = generate_random_document(field_schema, context=context)
+    documents = meta["factory"](contexts)
 
-        if primary_key != "_id" and primary_key not in doc:
-            pk_type = field_schema.get(primary_key, {}).get("type", "string")
+    # Only needed when the primary key is not part of the schema itself
+    if primary_key != "_id" and primary_key not in field_schema:
+        pk_type = field_schema.get(primary_key, {}).get("type", "string")
+        for doc in documents:
             doc[primary_key] = generate_random_value(pk_type)
 
-        documents.append(doc)
+    if args.bulk_write_size > 1 and not args.debug:
+        namespace = f"{random_db}.{random_collection}"
+        def record_inserted(_):
+            # pymongo assigns _id to each document as it encodes the bulk write
+            pk_values = [doc[primary_key] for doc in documents if primary_key in doc]
+            insert_results.put(((random_db, random_collection), len(documents), pk_values))
+        queue_bulk_write(args, "insert", namespace, [InsertOne(doc, namespace=namespace) for doc in documents], record_inserted)
+        return
 
     try:
-        result = collection.insert_many(documents)
-        with lock:
-            insert_count += 1
-            docs_inserted += len(result.inserted_ids)
+        # Unordered so the server doesn't stop at the first failed document; insert_many already
+        # splits the batch by maxWriteBatchSize/maxMessageSizeBytes, so no manual chunking is needed
+        result = collection.insert_many(documents, ordered=False)
+        if primary_key == "_id":
+            pk_values = result.inserted_ids
+        else:
+            pk_values = [doc[primary_key] for doc in documents if primary_key in doc]
+        # Hand the bookkeeping off to the aggregator thread
+        insert_results.put(((random_db, random_collection), len(result.inserted_ids), pk_values))
 
-            if (random_db, random_collection) not in inserted_primary_keys:
-                inserted_primary_keys[(random_db, random_collection)] = []
+    except pymongo.errors.PyMongoError as e:
+        logging.error(f"Error inserting documents into {random_db}.{random_collection}: {e}")
 
-            if primary_key == "_id":
-                inserted_primary_keys[(random_db, random_collection)].extend(result.inserted_ids)
-            else:
-                inserted_primary_keys[(random_db, random_collection)].extend(
-                    doc[primary_key] for doc in documents if primary_key in doc
-                )
 
+#####################################################################
+# Batched selects for the ineffective path (--select_batch_size).
+# Each thread buffers queries per collection and runs the whole batch
+# as the sub-pipelines of a single $facet aggregation: one round trip
+#####################################################################
+_select_batches = threading.local()
+
+def queue_batched_select(args, collection, query, projection):
+    pending = getattr(_select_batches, "pending", None)
+    if pending is None:
+        pending = _select_batches.pending = {}
+    if collection.full_name not in pending:
+        pending[collection.full_name] = (collection, [])
+    batch = pending[collection.full_name][1]
+
+    batch.append((query, projection))
+    if len(batch) >= args.select_batch_size:
+        flush_select_batch(collection, batch)
+
+def flush_select_batch(collection, batch):
+    facets = {}
+    for i, (query, projection) in enumerate(batch):
+        stages = [{"$match": query}, {"$limit": 5}]
+        if projection:
+            stages.append({"$project": projection})
+        facets[f"q{i}"] = stages
+    batch_count = len(batch)
+    batch.clear()
+
+    try:
+        result = next(collection.aggregate([{"$facet": facets}]), {})
+        select_count.add(batch_count)
+        docs_selected.add(sum(len(docs) for docs in result.values()))
     except pymongo.errors.PyMongoError as e:
-        logging.error(f"Error inserting documents into {random_db}.{random_collection}: {e}")
+        logging.error(f"Error running batched selects on {collection.full_name}: {e}")
 
+# Run whatever is left in this thread's select batches (called when a worker finishes)
+def flush_pending_selects():
+    pending = getattr(_select_batches, "pending", None)
+    if not pending:
+        return
+    for collection, batch in pending.values():
+        if batch:
+            flush_select_batch(collection, batch)
 
 ##############
 # Select Docs
 ##############
 def select_documents(args, base_collection, random_db, random_collection, collection_def, optimized):
-    global select_count, docs_selected, collection_shard_metadata
     
-    client = mongo_client.get_client()
-    collection = client[random_db][random_collection]
+    collection = get_collection(random_db, random_collection)
 
-    # Find the matching collection schema
-    coll_entry = next(
-        (item for item in collection_def
-         if item.get("databaseName") == random_db and item.get("collectionName") == base_collection),
-        None
-    )
-    if not coll_entry:
+    meta = get_collection_meta(collection_def, random_db, base_collection)
+    if not meta:
         logging.error(f"No schema found for {random_db}.{base_collection}")
         return
 
-    field_schema = coll_entry.get("fieldName", {})
-    primary_key = get_primary_key_from_collection(coll_entry)
-    primary_key_type = field_schema.get(primary_key, {}).get("type", "string")
+    field_schema = meta["field_schema"]
+    primary_key = meta["primary_key"]
+    primary_key_type = meta["primary_key_type"]
 
     # Use existing primary key if available
-    pk_values = inserted_primary_keys.get((random_db, random_collection), [])
-    if pk_values:
-        pk_value = random.choice(pk_values)
-    else:
+    pk_value = sample_primary_key(random_db, random_collection)
+    if pk_value is None:
         pk_value = generate_random_value(primary_key_type)
 
     # Build full query parameter list
@@ -419,22 +917,19 @@ def select_documents(args, base_collection, random_db, random_collection, collec
         query_fields.append(field_name)
         query_types.append(bson_type)
 
-    # Generate select queries
-    optimized_queries, ineffective_queries, query_projections = mongodbLoadQueries.select_queries(
-        query_params, query_fields, query_types
-    )
+    # Pick one select query. Only the chosen query is built, not every candidate
+    query, projection = mongodbLoadQueries.pick_select_query(query_params, query_fields, query_types, optimized)
 
     try:
-        if optimized and optimized_queries:
-            query = random.choice(optimized_queries)
+        if optimized and query is not None:
 
             # Shard-awareness check
             shard_info = collection_shard_metadata.get((random_db, random_collection), {})
-            if shard_info.get("sharded"):
-                missing_keys = [k for k in shard_info.get("shard_keys", []) if k not in query]
-                if missing_keys:
+            if shard_info.get("sharded") and not shard_info["shard_keys_fs"] <= query.keys():
+                if args.debug:
+                    missing_keys = [k for k in shard_info["shard_keys"] if k not in query]
                     logging.debug(f"Skipping select on sharded collection {random_db}.{random_collection}: Query missing shard keys {missing_keys}.")
-                    return
+                return
 
             # --- DEBUG LOGGING ---
             if args.debug:
@@ -454,13 +949,13 @@ def select_documents(args, base_collection, random_db, random_collection, collec
                 logging.debug("---------------------------------------------------\n")
             
             if count:
-                with lock:
-                    docs_selected += count
+                docs_selected.add(count)
 
-        elif ineffective_queries:
-            query_index = random.randint(0, len(ineffective_queries) - 1)
-            query = ineffective_queries[query_index]
-            projection = query_projections[query_index] if query_index < len(query_projections) else None
+        elif query is not None:
+            # Batched selects are counted when their batch is flushed. Debug mode keeps one query per round trip for readable logs
+            if args.select_batch_size > 1 and not args.debug:
+                queue_batched_select(args, collection, query, projection)
+                return
 
             # --- DEBUG LOGGING ---
             if args.debug:
@@ -470,7 +965,10 @@ def select_documents(args, base_collection, random_db, random_collection, collec
                 if projection:
                     logging.debug(f"Projection: {pprint.pformat(projection)}")
 
-            cursor = collection.find(query, projection).limit(5)
+            # The documents are only counted outside debug mode, so have the driver hand them back as
+            # RawBSONDocument (undecoded bytes) instead of building a dict for every field (the view is cached)
+            find_collection = collection if args.debug else get_raw_collection(random_db, random_collection)
+            cursor = find_collection.find(query, projection).limit(5)
             results = list(cursor)
             result_count = len(results)
 
@@ -482,11 +980,9 @@ def select_documents(args, base_collection, random_db, random_collection, collec
                 logging.debug("-------------------------------------------------\n")
 
             if result_count:
-                with lock:
-                    docs_selected += result_count
+                docs_selected.add(result_count)
 
-        with lock:
-            select_count += 1
+        select_count.add()
 
     except pymongo.errors.PyMongoError as e:
         logging.error(f"Error selecting from collection {random_db}.{random_collection}: {e}")
@@ -495,95 +991,41 @@ def select_documents(args, base_collection, random_db, random_collection, collec
 # Update Docs
 ##############
 def update_documents(args, base_collection, random_db, random_collection, collection_def, optimized):
-    global update_count, docs_updated, collection_shard_metadata
 
-    collection = get_client()[random_db][random_collection]
+    collection = get_collection(random_db, random_collection)
 
-    coll_entry = next(
-        (item for item in collection_def
-         if item.get("databaseName") == random_db and item.get("collectionName") == base_collection),
-        None
-    )
-    if not coll_entry:
+    meta = get_collection_meta(collection_def, random_db, base_collection)
+    if not meta:
         logging.error(f"No schema found for {random_db}.{base_collection}")
         return
 
-    field_schema = coll_entry.get("fieldName", {})
-    primary_key = get_primary_key_from_collection(coll_entry)
-    primary_key_type = field_schema.get(primary_key, {}).get("type", "string")
+    field_schema = meta["field_schema"]
+    primary_key = meta["primary_key"]
+    primary_key_type = meta["primary_key_type"]
 
     # Select PK value from inserted keys or generate one
-    pk_values = inserted_primary_keys.get((random_db, random_collection), [])
-    if pk_values:
-        pk_value = random.choice(pk_values)
-    else:
+    pk_value = sample_primary_key(random_db, random_collection)
+    if pk_value is None:
         pk_value = generate_random_value(primary_key_type)
 
     # Prepare fields excluding primary key
-    update_fields = [f for f in field_schema if f != primary_key]
-    if not update_fields:
+    update_plan = meta["update_plan"]
+    if not update_plan:
         logging.warning(f"No updateable fields found for {random_db}.{random_collection}")
         return
 
-    num_fields_to_update = random.randint(1, min(5, len(update_fields)))
-    selected_fields = random.sample(update_fields, num_fields_to_update)
-
-    new_values = []
-    new_types = []
+    num_fields_to_update = random.randint(1, min(5, len(update_plan)))
+    selected = random.sample(update_plan, num_fields_to_update)
 
-    # --- MODIFIED SECTION FOR PROVIDER HANDLING IN UPDATES ---
-    # Need to generate context *if* any of the selected_fields require it.
-    # This might require fetching the existing document to get its context values.
-    # For simplicity and to fix the immediate error, we'll mimic the generate_random_document
-    # context generation, which assumes new values. If you need to update based on *existing*
-    # document values (e.g., reduce seats available), you'd need to fetch the document first.
-    
-    # For this fix, we'll generate a fresh context for providers that need it.
-    # This will generate new random plane_type and total_seats values for 'equip'.
-    # If the update should be relative to the existing document, this needs more logic.
-    need_context = any(field_schema[f].get("provider") in ["passengers", "equip", "total_seats", "seats_available"] for f in selected_fields)
-    context = generate_aircraft_context() if need_context else {} # Assuming generate_aircraft_context exists and provides these.
-
-    for f in selected_fields:
-        props = field_schema[f]
-        provider = props.get("provider")
-        ftype = props.get("type", "string")
+    # Context-aware providers get a fresh aircraft context (new values, not relative to the
+    # existing document). Fetch the document first if updates need to build on its values
+    need_context = any(needs_ctx for _, _, _, needs_ctx in selected)
+    context = generate_aircraft_context() if need_context else {}
 
-        new_val = None
-        if provider:
-            # Handle special context-aware providers first, similar to generate_random_document
-            if provider == "passengers":
-                new_val = fake.passengers(
-                    total_seats=context.get("total_seats", 100),
-                    num_passengers=context.get("num_passengers", 10),
-                    fake=fake
-                )
-            elif provider == "equip":
-                # Ensure context exists for these arguments
-                plane_type = context.get("plane_type", "Airbus A320")
-                total_seats = context.get("total_seats", 100)
-                new_val = fake.equip(plane_type, total_seats)
-                logging.debug(f"Update: Field '{f}': Used provider '{provider}' with plane_type={plane_type}, total_seats={total_seats}.")
-            elif provider == "total_seats":
-                new_val = str(context.get("total_seats", 100)) # Ensure type consistency if 'str' is expected
-            elif provider == "seats_available":
-                new_val = context.get("seats_available", 0)
-            else: # All other general providers (like 'drivers', 'rental_options')
-                provider_func = getattr(fake, provider, None)
-                if callable(provider_func):
-                    new_val = provider_func()
-                    logging.debug(f"Update: Field '{f}': Used general provider '{provider}'.")
-                else:
-                    logging.warning(f"Update: Provider '{provider}' not found or not callable on 'fake' object for field '{f}'. Falling back to generic type '{ftype}'.")
-                    new_val = generate_random_value(ftype)
-        else:
-            # Fallback to generic generate_random_value if no provider
-            logging.debug(f"Update: Field '{f}': No provider specified. Using generic type '{ftype}'.")
-            new_val = generate_random_value(ftype)
-        
-        new_values.append(new_val)
-        new_types.append(ftype)
-    # --- END MODIFIED SECTION ---
+    selected_fields = [f for f, _, _, _ in selected]
+    new_values = [gen(context) for _, gen, _, _ in selected]
+    new_types = [ftype for _, _, ftype, _ in selected]
+    logging.debug(f"Update: Fields {selected_fields} with types {new_types}.")
 
     # Generate optimized and ineffective update queries
     optimized_updates, ineffective_updates = mongodbLoadQueries.update_queries(
@@ -608,22 +1050,19 @@ def update_documents(args, base_collection, random_db, random_collection, collec
     shard_info = collection_shard_metadata.get((random_db, random_collection), {})
     is_sharded = shard_info.get("sharded", False)
     shard_keys = shard_info.get("shard_keys", [])
+    shard_keys_fs = shard_info.get("shard_keys_fs", frozenset())
 
     # Determine if update modifies a shard key field
-    modified_fields = [
-        field
+    modifies_shard_key = any(
+        not shard_keys_fs.isdisjoint(op.keys())
         for op in update_doc.values()
         if isinstance(op, dict)
-        for field in op.keys()
-    ]
-
-    modifies_shard_key = any(f in shard_keys for f in modified_fields)
+    )
 
     # Skip update if shard key is modified without full shard key filter
     # This usually happens when creating workloads for both sharded and non-sharded collections
     if is_sharded and modifies_shard_key:
-        missing_keys = [k for k in shard_keys if k not in filter_query]
-        if missing_keys:
+        if not shard_keys_fs <= filter_query.keys():
             # logging.warning(
             #     f"Skipping update for {random_db}.{random_collection}: "
             #     f"attempts to modify shard key fields {shard_keys} "
@@ -632,16 +1071,21 @@ def update_documents(args, base_collection, random_db, random_collection, collec
             # )
             return
 
+    if args.bulk_write_size > 1 and not args.debug:
+        model = UpdateOne if optimized or modifies_shard_key else UpdateMany
+        namespace = f"{random_db}.{random_collection}"
+        queue_bulk_write(args, "update", namespace, [model(filter_query, update_doc, namespace=namespace)])
+        return
+
     try:
         if optimized or modifies_shard_key:
             result = collection.update_one(filter_query, update_doc)
         else:
             result = collection.update_many(filter_query, update_doc)
 
-        with lock:
-            update_count += 1
-            if result.modified_count > 0:
-                docs_updated += result.modified_count
+        update_count.add()
+        if result.modified_count > 0:
+            docs_updated.add(result.modified_count)
     except Exception as e:
         logging.error(f"Error updating document {primary_key}={pk_value}: {e}")
 
@@ -649,31 +1093,24 @@ def update_documents(args, base_collection, random_db, random_collection, collec
 # Delete Docs
 ##############
 def delete_documents(args, base_collection, random_db, random_collection, collection_def, optimized):
-    global delete_count, docs_deleted, collection_shard_metadata
-    collection = get_client()[random_db][random_collection]
+    collection = get_collection(random_db, random_collection)
 
-    # Find schema
-    coll_entry = next(
-        (item for item in collection_def
-         if item.get("databaseName") == random_db and item.get("collectionName") == base_collection),
-        None
-    )
-    if not coll_entry:
+    meta = get_collection_meta(collection_def, random_db, base_collection)
+    if not meta:
         logging.error(f"No schema found for {random_db}.{base_collection}")
         return
 
-    field_schema = coll_entry.get("fieldName", {})
-    primary_key = get_primary_key_from_collection(coll_entry)
-    primary_key_type = field_schema.get(primary_key, {}).get("type", "string")
+    field_schema = meta["field_schema"]
+    primary_key = meta["primary_key"]
+    primary_key_type = meta["primary_key_type"]
 
     # Build values for all fields
-    pk_values = inserted_primary_keys.get((random_db, random_collection), [])
-    if pk_values:
-        pk_value = random.choice(pk_values)
-    else:
+    pk_value = sample_primary_key(random_db, random_collection)
+    if pk_value is None:
         # If no inserted keys, generate a random one. This delete might not match an existing doc.
         pk_value = generate_random_value(primary_key_type)
-        logging.debug(f"No inserted PKs found for {random_db}.{random_collection}. Generating random PK for delete: {pk_value}")
+        # %-style arguments so the message is only formatted when debug logging is enabled
+        logging.debug("No inserted PKs found for %s.%s. Generating random PK for delete: %s", random_db, random_collection, pk_value)
 
 
     query_params = []
@@ -692,27 +1129,23 @@ def delete_documents(args, base_collection, random_db, random_collection, collec
         query_types.append(ftype)
 
 
-    # Generate delete queries, passing primary_key and pk_value explicitly
-    optimized_queries, ineffective_queries = mongodbLoadQueries.delete_queries(
-        query_params, query_fields, query_types, primary_key, pk_value # <-- Pass primary_key and pk_value
+    # Pick one delete query, passing primary_key and pk_value explicitly. Only the chosen query is built
+    query = mongodbLoadQueries.pick_delete_query(
+        query_params, query_fields, query_types, primary_key, pk_value, optimized
     )
 
     try:
-        query = {} # Initialize query to avoid UnboundLocalError
-        if optimized and optimized_queries:
-            query = random.choice(optimized_queries)
-            delete_op_type = "one" # Optimized deletes should use delete_one
-        elif ineffective_queries:
-            query = random.choice(ineffective_queries)
-            delete_op_type = "many" # Ineffective deletes should use delete_many
-        else:
+        if query is None:
             logging.warning("No delete queries generated")
             return
+        # Optimized deletes should use delete_one, ineffective deletes should use delete_many
+        delete_op_type = "one" if optimized else "many"
 
         # Shard-awareness: check if query has full shard key
         shard_info = collection_shard_metadata.get((random_db, random_collection), {})
         is_sharded = shard_info.get("sharded", False)
         shard_keys = shard_info.get("shard_keys", [])
+        shard_keys_fs = shard_info.get("shard_keys_fs", frozenset())
 
         # If sharded and we are doing an "ineffective" delete (which means delete_many)
         # without a full shard key, we should ideally skip it or be aware of its implications.
@@ -720,14 +1153,30 @@ def delete_documents(args, base_collection, random_db, random_collection, collec
         # for `delete_one`. For `delete_many` on sharded collections, if the query
         # doesn't contain the shard key, it will scatter reads/writes.
         if is_sharded and shard_keys and delete_op_type == "one": # Only check for `delete_one` as `delete_many` is by design broader
-            missing_keys = [k for k in shard_keys if k not in query]
-            if missing_keys:
-                logging.debug(
-                    f"Skipping delete_one on sharded collection {random_db}.{random_collection}: "
-                    f"Query missing shard key fields {missing_keys}. Query: {query}"
-                )
+            if not shard_keys_fs <= query.keys():
+                if args.debug:
+                    missing_keys = [k for k in shard_keys if k not in query]
+                    logging.debug(
+                        f"Skipping delete_one on sharded collection {random_db}.{random_collection}: "
+                        f"Query missing shard key fields {missing_keys}. Query: {query}"
+                    )
                 return
 
+        if args.bulk_write_size > 1 and not args.debug:
+            model = DeleteOne if delete_op_type == "one" else DeleteMany
+            on_success = None
+            if primary_key in query and query[primary_key] == pk_value:
+                pk_buffer = inserted_primary_keys.get((random_db, random_collection))
+                if pk_buffer is not None:
+                    def on_success(delete_result):
+                        # Like the non-bulk path, only drop the PK if the delete removed something. Per-collection
+                        # bulk writes (pre-8.0 servers) don't report per-delete counts, so the PK is kept there
+                        if delete_result is not None and delete_result.deleted_count > 0:
+                            pk_buffer.remove(pk_value)
+            namespace = f"{random_db}.{random_collection}"
+            queue_bulk_write(args, "delete", namespace, [model(query, namespace=namespace)], on_success)
+            return
+
         if delete_op_type == "one":
             result = collection.delete_one(query)
         else: # delete_op_type == "many"
@@ -735,18 +1184,18 @@ def delete_documents(args, base_collection, random_db, random_collection, collec
             # but it's important to understand this will be a broadcast operation if not present.
             result = collection.delete_many(query)
 
-        with lock:
-            delete_count += 1
-            if result.deleted_count > 0:
-                docs_deleted += result.deleted_count
-                # If a document was deleted by its primary key, remove it from inserted_primary_keys
-                if primary_key in query and query[primary_key] == pk_value:
-                    if (random_db, random_collection) in inserted_primary_keys and pk_value in inserted_primary_keys[(random_db, random_collection)]:
-                        inserted_primary_keys[(random_db, random_collection)].remove(pk_value)
-                        logging.debug(f"Removed PK {pk_value} from cache after successful delete.")
+        delete_count.add()
+        if result.deleted_count > 0:
+            docs_deleted.add(result.deleted_count)
+            # If a document was deleted by its primary key, remove it from inserted_primary_keys
+            if primary_key in query and query[primary_key] == pk_value:
+                pk_buffer = inserted_primary_keys.get((random_db, random_collection))
+                if pk_buffer is not None:
+                    pk_buffer.remove(pk_value)
+                    logging.debug("Removed PK %s from cache after successful delete.", pk_value)
 
     except Exception as e:
-        logging.error(f"Error deleting documents with query {query}: {e}")
+        log_error_rate_limited("delete", "Error deleting documents with query %s: %s", query, e)
 
 
 #######################
@@ -764,39 +1213,11 @@ def workload_ratio_config(args):
         "delete_ratio": 10,
         "select_ratio": 60
     }
-    # Store custom workload ratios
-    ratio_args = {
-        "insert_ratio": args.insert_ratio,
-        "update_ratio": args.update_ratio,
-        "delete_ratio": args.delete_ratio,
-        "select_ratio": args.select_ratio,
-    }
-    # Store workloads to skip if any
-    skip_args = {
-        "skip_update": args.skip_update,
-        "skip_delete": args.skip_delete,
-        "skip_insert": args.skip_insert,
-        "skip_select": args.skip_select,
-    }
-    # Ensure all required keys exist in the ratio_args, defaulting to None if missing
+    # Custom workload ratios (None when unspecified), set to 0 for workloads the user wants to skip
     ratios = {
-        "insert_ratio": ratio_args.get("insert_ratio", None),
-        "update_ratio": ratio_args.get("update_ratio", None),
-        "delete_ratio": ratio_args.get("delete_ratio", None),
-        "select_ratio": ratio_args.get("select_ratio", None),
+        key: 0 if getattr(args, "skip_" + key[:-len("_ratio")], False) else getattr(args, key, None)
+        for key in default_ratios
     }
-    # Take into account if the user wants to skip specific workloads
-    skip = {
-        "skip_update": skip_args.get("skip_update", False),
-        "skip_delete": skip_args.get("skip_delete", False),
-        "skip_insert": skip_args.get("skip_insert", False),
-        "skip_select": skip_args.get("skip_select", False),
-    }
-    # Set ratios to 0 for skipped workloads
-    for key, skip_flag in skip.items():
-        if skip_flag:
-            ratio_key = key.replace("skip_", "") + "_ratio"
-            ratios[ratio_key] = 0
     # Calculate sum of specified ratios
     specified_ratios = {k: v for k, v in ratios.items() if v is not None}
     specified_sum = sum(specified_ratios.values())
@@ -840,10 +1261,33 @@ def workload_ratio_config(args):
 ###############################
 # Output workload configuration
 ###############################
+# Dedented once at import time; filled in with format_map when the workload starts
+_WORKLOAD_DETAILS_TEMPLATE = textwrap.dedent("""\n 
+    Duration: {workload_length}
+    CPUs: {cpu}
+    Threads: (Per CPU: {threads} | Total: {total_threads})    
+    Database and Collection: ({collection_info})   
+    Instances of the same collection: {collections}
+    Configure Sharding: {shard_enabled}
+    Insert batch size: {batch_size}
+    Fast inserts (w=0): {fast_insert}
+    Client bulk write size: {bulk_write_size}
+    Optimized workload: {optimized}
+    Workload ratio: (SELECTS: {select_ratio}% | INSERTS: {insert_ratio}% | UPDATES: {update_ratio}% | DELETES: {delete_ratio}%)
+    Report frequency: {report_interval} seconds
+    Report logfile: {log}\n
+    {rule}
+    {title}
+    {rule}\n""")
+_workload_logged = False
+
 def log_workload_config(collection_def, args, shard_enabled, workload_length, workload_ratios, workload_logged):
-    # Check if the function has already been executed
-    if workload_logged:
-        return
+    global _workload_logged
+    # Check if the function has already been executed (by this or an earlier call)
+    with log_lock:
+        if workload_logged or _workload_logged:
+            return
+        _workload_logged = True
 
     if isinstance(collection_def, dict):
         collection_def = [collection_def]
@@ -855,76 +1299,113 @@ def log_workload_config(collection_def, args, shard_enabled, workload_length, wo
     )
 
     table_width = 115
-    workload_details = textwrap.dedent(f"""\n 
-    Duration: {workload_length}
-    CPUs: {args.cpu}
-    Threads: (Per CPU: {args.threads} | Total: {args.cpu * args.threads})    
-    Database and Collection: ({collection_info})   
-    Instances of the same collection: {"Disabled" if args.custom_queries else args.collections}
-    Configure Sharding: {shard_enabled}
-    Insert batch size: {args.batch_size}
-    Optimized workload: {"Disabled" if args.custom_queries else args.optimized}
-    Workload ratio: (SELECTS: {int(round(float(workload_ratios['select_ratio']), 0))}% | INSERTS: {int(round(float(workload_ratios['insert_ratio']), 0))}% | UPDATES: {int(round(float(workload_ratios['update_ratio']), 0))}% | DELETES: {int(round(float(workload_ratios['delete_ratio']), 0))}%)
-    Report frequency: {args.report_interval} seconds
-    Report logfile: {args.log}\n
-    {'=' * table_width}
-    {' Workload Started':^{table_width - 2}}
-    {'=' * table_width}\n""")    
-    # with log_lock:  # This ensures only one process can log at a time
+    workload_details = _WORKLOAD_DETAILS_TEMPLATE.format_map({
+        "workload_length": workload_length,
+        "cpu": args.cpu,
+        "threads": args.threads,
+        "total_threads": args.cpu * args.threads,
+        "collection_info": collection_info,
+        "collections": "Disabled" if args.custom_queries else args.collections,
+        "shard_enabled": shard_enabled,
+        "batch_size": args.batch_size,
+        "fast_insert": args.fast_insert,
+        "bulk_write_size": args.bulk_write_size,
+        "optimized": "Disabled" if args.custom_queries else args.optimized,
+        **{key: int(round(float(workload_ratios[key]), 0)) for key in ("select_ratio", "insert_ratio", "update_ratio", "delete_ratio")},
+        "report_interval": args.report_interval,
+        "log": args.log,
+        "rule": "=" * table_width,
+        "title": f"{' Workload Started':^{table_width - 2}}",
+    })
     logging.info(workload_details)
-    # Set the flag to True to prevent further logging
-    workload_logged = True  
  
 
 ##########################################
 # Calculate operations per report_interval
 ##########################################
-def calculate_ops_per_interval(args, allThreads, report_interval=5, process_id=0, total_ops_dict=None, lock=None):
+def calculate_ops_per_interval(args, workers_latch, report_interval=5, process_id=0, total_ops_rates=None):
     last_insert_count = 0
     last_update_count = 0
     last_delete_count = 0
     last_select_count = 0
-    while not stop_event.is_set() and any(thread.is_alive() for thread in allThreads):
-        time.sleep(report_interval)  # Wait for report_interval seconds
-        with lock:
-            inserts_per_sec = (insert_count - last_insert_count) / report_interval
-            updates_per_sec = (update_count - last_update_count) / report_interval
-            deletes_per_sec = (delete_count - last_delete_count) / report_interval
-            selects_per_sec = (select_count - last_select_count) / report_interval
-
-            total_ops_per_sec = selects_per_sec + inserts_per_sec + updates_per_sec + deletes_per_sec
-            last_insert_count = insert_count
-            last_update_count = update_count
-            last_delete_count = delete_count
-            last_select_count = select_count
-
-            # Update shared dictionary for total operations tracking
-            if total_ops_dict is not None:
-                total_ops_dict['insert'][process_id] = inserts_per_sec
-                total_ops_dict['update'][process_id] = updates_per_sec
-                total_ops_dict['delete'][process_id] = deletes_per_sec
-                total_ops_dict['select'][process_id] = selects_per_sec
+    while not stop_event.is_set():
+        # Wait for report_interval seconds, but wake up as soon as the last worker exits
+        if workers_latch.done.wait(report_interval):
+            break
+        # No lock needed: the counters are lock-free and only this process writes its total_ops_rates slot
+        current_insert_count = insert_count.value
+        current_update_count = update_count.value
+        current_delete_count = delete_count.value
+        current_select_count = select_count.value
+
+        inserts_per_sec = (current_insert_count - last_insert_count) / report_interval
+        updates_per_sec = (current_update_count - last_update_count) / report_interval
+        deletes_per_sec = (current_delete_count - last_delete_count) / report_interval
+        selects_per_sec = (current_select_count - last_select_count) / report_interval
+
+        total_ops_per_sec = selects_per_sec + inserts_per_sec + updates_per_sec + deletes_per_sec
+        last_insert_count = current_insert_count
+        last_update_count = current_update_count
+        last_delete_count = current_delete_count
+        last_select_count = current_select_count
+
+        # Publish this process' rates for total operations tracking
+        if total_ops_rates is not None:
+            total_ops_rates.publish(process_id, (inserts_per_sec, updates_per_sec, deletes_per_sec, selects_per_sec))
 
         
 
+#####################################################################
+# Per-process (inserts, updates, deletes, selects) rates kept in one
+# shared memory block of doubles, so publishing and summing them are
+# plain memory reads/writes instead of manager round trips. Pickling
+# only sends the block's name; the receiving process attaches to it
+#####################################################################
+_RATE_FIELDS = 4
+_RATE_STRUCT = struct.Struct(f"{_RATE_FIELDS}d")
+
+class SharedOpRates:
+    def __init__(self, cpus, name=None):
+        self.cpus = cpus
+        if name is None:
+            # A new block is zero-filled, so every rate starts at 0.0
+            self._shm = shared_memory.SharedMemory(create=True, size=cpus * _RATE_STRUCT.size)
+        else:
+            # Child processes share the parent's resource tracker, so attaching doesn't hand them ownership
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self._all_rates = struct.Struct(f"{cpus * _RATE_FIELDS}d")
+
+    def __reduce__(self):
+        return (SharedOpRates, (self.cpus, self.name))
+
+    def publish(self, process_id, rates):
+        _RATE_STRUCT.pack_into(self._shm.buf, process_id * _RATE_STRUCT.size, *rates)
+
+    def totals(self):
+        rates = self._all_rates.unpack_from(self._shm.buf)
+        return tuple(sum(rates[field::_RATE_FIELDS]) for field in range(_RATE_FIELDS))
+
+    def close(self, unlink=False):
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
 ##############################################
 # Output total operations across all CPUs
 ##############################################
-def log_total_ops_per_interval(args, total_ops_dict, stop_event, lock):
-    while not stop_event.is_set():
-        time.sleep(args.report_interval)
+def log_total_ops_per_interval(args, total_ops_rates, stop_event, lock):
+    # Event.wait returns True as soon as the stop event is set, instead of sleeping out the interval
+    while not stop_event.wait(args.report_interval):
         with lock:
-            total_selects = sum(total_ops_dict['select'])
-            total_inserts = sum(total_ops_dict['insert'])
-            total_updates = sum(total_ops_dict['update'])
-            total_deletes = sum(total_ops_dict['delete'])
+            total_inserts, total_updates, total_deletes, total_selects = total_ops_rates.totals()
             total_ops = total_selects + total_inserts + total_updates + total_deletes
 
             if total_ops: # We only provide the output if the total ops isn't zero
+                # Lazy %-formatting: the message is only built if a handler actually emits it
                 logging.info(
-                    f"AVG Operations last {args.report_interval}s ({args.cpu} CPUs): {total_ops:.2f} "
-                    f"(SELECTS: {total_selects:.2f}, INSERTS: {total_inserts:.2f}, "
-                    f"UPDATES: {total_updates:.2f}, DELETES: {total_deletes:.2f})"
+                    "AVG Operations last %ss (%s CPUs): %.2f (SELECTS: %.2f, INSERTS: %.2f, UPDATES: %.2f, DELETES: %.2f)",
+                    args.report_interval, args.cpu, total_ops, total_selects, total_inserts, total_updates, total_deletes
                 )
 
 #####################################################################
@@ -940,10 +1421,10 @@ def workload_stats(select_count, insert_count, update_count, delete_count, proce
             "insert": insert_count,
             "delete": delete_count,
             "update": update_count,
-            "docs_inserted": docs_inserted,
-            "docs_selected": docs_selected,
-            "docs_updated": docs_updated,
-            "docs_deleted": docs_deleted
+            "docs_inserted": docs_inserted.value,
+            "docs_selected": docs_selected.value,
+            "docs_updated": docs_updated.value,
+            "docs_deleted": docs_deleted.value
         }
     }
     output_queue.put(stats_dict)
@@ -956,12 +1437,11 @@ def workload_stats(select_count, insert_count, update_count, delete_count, proce
 ##########################################################################
 def collection_stats(collection_def, collections, collection_queue):
     collstats_dict = {}  # Dictionary to store all collection stats
+    client = get_client()
 
     for entry in collection_def:
         base_collection_name = entry["collectionName"]
         db_name = entry["databaseName"]
-
-        client = get_client()
         db = client[db_name]
 
         for i in range(1, collections + 1):
@@ -984,48 +1464,69 @@ def collection_stats(collection_def, collections, collection_queue):
 # Randomly choose operations and collections for the workload
 #############################################################
 
+SAMPLE_CHUNK = 1024  # Operations/collections drawn per random.choices call in random_worker
+
+# Numeric suffix of collection instances (e.g., _1, _2, etc.)
+_SUFFIX_RE = re.compile(r'_\d+$')
+
+# The target collections as parallel (dbs, collections, base collections) lists, so a worker picks one index per operation.
+# The suffix is used to create variations of the same collection, but we only need the base name to obtain the
+# collection definition from the JSON file, so it's removed once per collection here rather than per operation
+def collection_targets(created_collections, collections):
+    dbs = [db_name for db_name, _ in created_collections]
+    colls = [coll_name for _, coll_name in created_collections]
+    base_colls = [_SUFFIX_RE.sub('', coll_name) for coll_name in colls] if collections > 1 else list(colls)
+    return dbs, colls, base_colls
+
 #############################################################
 # WORKER FOR RANDOMIZED WORKLOAD (No user query file)
 #############################################################
 def random_worker(args, created_collections, collection_def):
     runtime = args.runtime 
     batch_size = args.batch_size
-    skip_update = args.skip_update
-    skip_delete = args.skip_delete
-    skip_insert = args.skip_insert
-    skip_select = args.skip_select 
     insert_ratio = args.insert_ratio if args.insert_ratio is not None else 10
     update_ratio = args.update_ratio if args.update_ratio is not None else 20
     delete_ratio = args.delete_ratio if args.delete_ratio is not None else 10 
     select_ratio = args.select_ratio if args.select_ratio is not None else 60 
     optimized = bool(args.optimized)
-    
-    work_start = time.time()
-    operations = ["insert", "update", "delete", "select"]
-    weights = [insert_ratio, update_ratio, delete_ratio, select_ratio]
-
-    while time.time() - work_start < runtime and not stop_event.is_set():  # Ensure graceful exit
-        operation = random.choices(operations, weights=weights, k=1)[0] # randomly choose what kind of operation based on the workload ratio
-        random_db, random_collection = random.choice(created_collections) # choose collections randomly
-        field_schema = collection_def[0]["fieldName"]  # All fields + types in the collection definition JSON file
-        # Gather collection metadata
-        # collection_shard_metadata = collect_shard_key_metadata(collection_def, args.collections)
-        collection_shard_metadata = collect_shard_key_metadata(random_db,random_collection)
-        # Remove numeric suffix from collection name (e.g., _1, _2, etc.)
-        # The suffix is used to create variations of the same collection, but we only need the base name to obtain the collection definition from the JSON file.
-        if args.collections > 1:
-            base_collection = re.sub(r'_\d+$', '', random_collection)
-        else:
-            base_collection = random_collection
+    bulk_writes = args.bulk_write_size > 1 and not args.debug
+
+    # Only the enabled operations go into the dispatch table, so the skip flags are checked once
+    # here instead of on every iteration. Each entry is called as op(random_db, random_collection, base_collection)
+    candidates = [
+        (args.skip_insert, insert_ratio, lambda db, coll, base: insert_documents(args, base, db, coll, collection_def, batch_size)),
+        (args.skip_update, update_ratio, lambda db, coll, base: update_documents(args, base, db, coll, collection_def, optimized)),
+        (args.skip_delete, delete_ratio, lambda db, coll, base: delete_documents(args, base, db, coll, collection_def, optimized)),
+        (args.skip_select, select_ratio, lambda db, coll, base: select_documents(args, base, db, coll, collection_def, optimized)),
+    ]
+    dispatch = [op for skip, ratio, op in candidates if not skip and ratio > 0]
+    weights = [ratio for skip, ratio, op in candidates if not skip and ratio > 0]
+    if not dispatch:
+        logging.warning("No operations enabled for the given ratios and skip options. Worker is idle.")
+        return
+
+    # Cumulative weights spare random.choices from re-accumulating the weights on every draw
+    cum_weights = list(itertools.accumulate(weights))
+
+    dbs, colls, base_colls = collection_targets(created_collections, args.collections)
+    collection_indexes = range(len(colls))
 
-        if operation == "insert" and not skip_insert:
-            insert_documents(args, base_collection, random_db, random_collection, collection_def, batch_size=10)
-        elif operation == "update" and not skip_update:
-            update_documents(args, base_collection, random_db, random_collection, collection_def, optimized)
-        elif operation == "delete" and not skip_delete:
-            delete_documents(args, base_collection, random_db, random_collection, collection_def, optimized)
-        elif operation == "select" and not skip_select:
-            select_documents(args, base_collection, random_db,random_collection, collection_def, optimized)
+    work_start = time.time()
+    running = True
+    while running:
+        # Randomly choose the next SAMPLE_CHUNK operations (based on the workload ratio) and target collections in one call each
+        ops = random.choices(dispatch, cum_weights=cum_weights, k=SAMPLE_CHUNK)
+        targets = random.choices(collection_indexes, k=SAMPLE_CHUNK)
+        for op, idx in zip(ops, targets):
+            if time.time() - work_start >= runtime or stop_event.is_set():  # Ensure graceful exit
+                running = False
+                break
+            if bulk_writes:
+                flush_stale_bulk_writes()
+            op(dbs[idx], colls[idx], base_colls[idx])
+
+    flush_pending_selects()
+    flush_bulk_writes()
 
 
 #############################################################
@@ -1033,82 +1534,89 @@ def random_worker(args, created_collections, collection_def):
 # Insert calls still use our random generator
 #############################################################
 def custom_worker(args, created_collections, collection_def, user_queries):
-    global select_count, insert_count, update_count, delete_count, docs_selected, docs_inserted, docs_updated, docs_deleted
     runtime = args.runtime
     
     # 1. Pre-process and categorize the user queries from the JSON file
     select_queries = [q for q in user_queries if q.get("operation") in ["find", "aggregate"]]
     update_queries = [q for q in user_queries if q.get("operation") in ["updateOne", "updateMany"]]
     delete_queries = [q for q in user_queries if q.get("operation") in ["deleteOne", "deleteMany"]]
-
-    # 2. Set up the operations and weights based on ratios
-    operations = []
-    weights = []
-    if not args.skip_select and args.select_ratio > 0 and select_queries:
-        operations.append("select")
-        weights.append(args.select_ratio)
-    if not args.skip_update and args.update_ratio > 0 and update_queries:
-        operations.append("update")
-        weights.append(args.update_ratio)
-    if not args.skip_insert and args.insert_ratio > 0:
-        operations.append("insert")
-        weights.append(args.insert_ratio)
-    if not args.skip_delete and args.delete_ratio > 0 and delete_queries:
-        operations.append("delete")
-        weights.append(args.delete_ratio)
+    queries_by_op = {"select": select_queries, "update": update_queries, "delete": delete_queries}
+
+    # With --bulk_write_size, user updates/deletes are queued into client bulk writes instead of
+    # running one round trip each (counters are updated when the bulk write is flushed)
+    bulk_writes = args.bulk_write_size > 1 and not args.debug
+    dbs, colls, base_colls = collection_targets(created_collections, args.collections)
+
+    def run_user_query(chosen_op):
+        query_def = random.choice(queries_by_op[chosen_op])
+        op_type, op_count, docs_affected = custom_query_executor.execute_user_query(args, query_def, get_fake(), generate_random_value)
+        if op_type:
+            record_op(op_type, op_count, docs_affected)
+
+    def queue_user_write(chosen_op):
+        query_def = random.choice(queries_by_op[chosen_op])
+        op_type, namespace, model = custom_query_executor.build_write_model(query_def, get_fake(), generate_random_value)
+        if op_type:
+            queue_bulk_write(args, op_type, namespace, [model])
+
+    # Insert functionality can be our own random and doesn't require the user providing theirs since we will be inserting random records
+    def run_insert(chosen_op):
+        idx = random.randrange(len(colls))
+        insert_documents(args, base_colls[idx], dbs[idx], colls[idx], collection_def, args.batch_size)
+
+    write_op = queue_user_write if bulk_writes else run_user_query
+
+    # 2. Set up the operations and weights based on ratios. Only the enabled operations go into
+    # the dispatch table, so the skip flags and query lists are checked once here
+    candidates = [
+        ("select", not args.skip_select and args.select_ratio > 0 and select_queries, args.select_ratio, run_user_query),
+        ("update", not args.skip_update and args.update_ratio > 0 and update_queries, args.update_ratio, write_op),
+        ("insert", not args.skip_insert and args.insert_ratio > 0, args.insert_ratio, run_insert),
+        ("delete", not args.skip_delete and args.delete_ratio > 0 and delete_queries, args.delete_ratio, write_op),
+    ]
+    operations = [(name, handler) for name, enabled, ratio, handler in candidates if enabled]
+    weights = [ratio for name, enabled, ratio, handler in candidates if enabled]
 
     if not operations:
         logging.warning("No operations available for the given ratios and user query file. Worker is idle.")
         return
 
     if args.debug:
-        # ---- ADD THIS LINE FOR DIAGNOSTICS ----
-        logging.debug(f"Hybrid worker started. Operations enabled: {operations}")
+        logging.debug(f"Hybrid worker started. Operations enabled: {[name for name, _ in operations]}")
+
+    cum_weights = list(itertools.accumulate(weights))
     work_start = time.time()
+    running = True
+    while running:
+        # 3. Choose the next SAMPLE_CHUNK operations based on the workload ratio in one call
+        for chosen_op, handler in random.choices(operations, cum_weights=cum_weights, k=SAMPLE_CHUNK):
+            if time.time() - work_start >= runtime or stop_event.is_set():
+                running = False
+                break
+            if bulk_writes:
+                flush_stale_bulk_writes()
+            # 4. Execute the chosen operation
+            handler(chosen_op)
 
-    while time.time() - work_start < runtime and not stop_event.is_set():
-        # 3. Choose an operation type based on the workload ratio
-        chosen_op = random.choices(operations, weights=weights, k=1)[0]
-        
-        # 4. Execute the chosen operation
-        if chosen_op == "select":
-            query_def = random.choice(select_queries)
-            op_type, op_count, docs_affected = custom_query_executor.execute_user_query(args, query_def, fake, generate_random_value)
-            if op_type:
-                with lock:
-                    select_count += op_count
-                    docs_selected += docs_affected
-        
-        elif chosen_op == "update":
-            query_def = random.choice(update_queries)
-            op_type, op_count, docs_affected = custom_query_executor.execute_user_query(args, query_def, fake, generate_random_value)
-            if op_type:
-                with lock:
-                    update_count += op_count
-                    docs_updated += docs_affected
-
-        elif chosen_op == "delete":
-            query_def = random.choice(delete_queries)
-            op_type, op_count, docs_affected = custom_query_executor.execute_user_query(args, query_def, fake, generate_random_value)
-            if op_type:
-                with lock:
-                    delete_count += op_count
-                    docs_deleted += docs_affected            
-
-        # Insert functionality can be our own random and doesn't require the user providing theirs since we will be inserting random records
-        elif chosen_op == "insert":
-            random_db, random_collection = random.choice(created_collections)
-            base_collection = re.sub(r'_\d+$', '', random_collection) if args.collections > 1 else random_collection
-            # Fallback to original random insert function
-            insert_documents(args, base_collection, random_db, random_collection, collection_def, args.batch_size)
+    flush_bulk_writes()
 
 
 ####################
 # Start the workload
 ####################
-def start_workload(args, process_id="", completed_processes="",output_queue="", collection_queue="", total_ops_dict=None, collection_def=None, created_collections=None, user_queries=None):
+def start_workload(args, process_id="", completed_processes="",output_queue="", collection_queue="", total_ops_rates=None, collection_def=None, created_collections=None, user_queries=None):
     # Handler for Ctrl+C
     signal.signal(signal.SIGINT, handle_exit)
+
+    # All of this process's threads share one client; make sure its pool has a connection for each
+    # of them (plus the reporter) so threads don't queue behind each other waiting for a connection
+    mongo_client.client_options["maxPoolSize"] = max(100, args.threads + 4)
+
+    if not collection_shard_metadata:
+        preload_shard_key_metadata(created_collections)
+
+    aggregator_thread = threading.Thread(target=insert_aggregator, daemon=True)
+    aggregator_thread.start()
  
     try:
         # Start multiple worker threads
@@ -1122,13 +1630,16 @@ def start_workload(args, process_id="", completed_processes="",output_queue="",
             target_worker = random_worker
             worker_args = (args, created_collections, collection_def)
 
+        # PyMongo releases the GIL while it waits on the socket, so each thread keeps its own
+        # operation in flight and --threads controls the outstanding operations per process
+        workers_latch = CountdownLatch(args.threads)
         for _ in range(args.threads):
-            thread = threading.Thread(target=target_worker, args=worker_args)
+            thread = threading.Thread(target=run_worker, args=(workers_latch, target_worker, worker_args))
             thread.start()
             allThreads.append(thread)
 
         # Start the thread to calculate QPS AFTER initializing the worker threads
-        logging_thread = threading.Thread(target=calculate_ops_per_interval, args=(args, allThreads,args.report_interval,process_id, total_ops_dict, lock), daemon=True)
+        logging_thread = threading.Thread(target=calculate_ops_per_interval, args=(args, workers_latch, args.report_interval, process_id, total_ops_rates), daemon=True)
         logging_thread.start()
 
         # Wait for all threads to finish
@@ -1140,13 +1651,16 @@ def start_workload(args, process_id="", completed_processes="",output_queue="",
         logging_thread.join()  # Wait for the thread to finish gracefully
 
     finally:
-        time.sleep(5) # We sleep a few seconds to make sure not to overlap with the real-time workload report
+        stop_event.wait(5) # We wait a few seconds to make sure not to overlap with the real-time workload report (skipped on Ctrl+C)
         # Mark this process as complete
         completed_processes[process_id] = True
+        # Let the aggregator drain any pending insert results before reporting
+        insert_results.put(None)
+        aggregator_thread.join()
         # Get collection stats after the workload has completed
         collection_stats(collection_def, args.collections, collection_queue)
         # Get workload stats
-        workload_stats(select_count, insert_count, update_count, delete_count, process_id, output_queue)
+        workload_stats(select_count.value, insert_count.value, update_count.value, delete_count.value, process_id, output_queue)
 
 
 
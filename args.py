@@ -9,6 +9,8 @@ parser.add_argument('--collection_definition', type=str, nargs='?', const='colle
 parser.add_argument('--recreate', action='store_true', help="Recreate the collection before running the test.")
 parser.add_argument('--runtime', type=str, default="60s", help="Duration of the load test, specify in seconds (e.g., 60s) or minutes (e.g., 5m) (default 60s).")
 parser.add_argument('--batch_size', type=int, default=10, help="Number of documents per batch insert (default 10).")
+parser.add_argument('--fast_insert', action='store_true', help="Send insert batches unacknowledged (w=0) for maximum insert throughput.")
+parser.add_argument('--bulk_write_size', type=int, default=1, help="Buffer this many insert/update/delete operations per thread and send them in one bulk write (requires pymongo 4.9+; one client bulk write on MongoDB 8.0+, one per collection on older servers) (default 1, disabled).")
 parser.add_argument('--threads', type=int, default=4, help="Number of threads for simultaneous operations (default 4).")
 parser.add_argument('--skip_update', action='store_true', help="Skip update operations.")
 parser.add_argument('--skip_delete', action='store_true', help="Skip delete operations.")
@@ -19,6 +21,7 @@ parser.add_argument('--update_ratio', type=int, help="Percentage of update opera
 parser.add_argument('--delete_ratio', type=int, help="Percentage of delete operations (default 10).")
 parser.add_argument('--select_ratio', type=int, help="Percentage of select operations (default 60).")
 parser.add_argument('--report_interval', type=int, default=5, help="Interval (in seconds) between workload stats output (default 5s).")
+parser.add_argument('--select_batch_size', type=int, default=1, help="Run this many non-optimized selects per round trip as a single $facet aggregation (default 1, disabled).")
 parser.add_argument('--optimized', action='store_true', help="Run optimized workload only.")
 parser.add_argument('--cpu', type=int, default=1, help="Number of CPUs to launch multiple instances in parallel (default 1).")
 parser.add_argument("--log", nargs="?", const=True, help="Log filename and path (e.g., /tmp/report.log).")
@@ -1,8 +1,15 @@
 from faker.providers import BaseProvider # type: ignore
 import random
 import string
+import functools
+import threading
 from datetime import datetime, timedelta
 
+# Alphabets used by the providers below, built once instead of on every call
+_UPPER = string.ascii_uppercase
+_DIGITS = string.digits
+_ALNUM = string.ascii_uppercase + string.digits
+
 class CustomProvider(BaseProvider):
     aircraft_seat_map = {
         "Airbus A320": 170,
@@ -13,6 +20,10 @@ class CustomProvider(BaseProvider):
         "ATR-72": 75,
         "ERJ-145": 50
     }
+    # Parallel tuples of the map above so a plane can be picked with a single index draw
+    aircraft_types = tuple(aircraft_seat_map)
+    aircraft_seats = tuple(aircraft_seat_map.values())
+    aircraft_max_passengers = tuple(min(70, seats) for seats in aircraft_seats)
 
     # Define the list of states once as a class attribute
     us_states = [
@@ -23,6 +34,35 @@ class CustomProvider(BaseProvider):
         "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY"
     ]
 
+    # Cities and person names are slow to generate with Faker, so a pool of each is drawn once per
+    # process, on first use, and shared by every thread's provider (the tuples are immutable)
+    city_pool_size = 2000
+    name_pool_size = 5000
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    def _pool(self, name, size, factory):
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    pool = self._pools[name] = tuple(factory() for _ in range(size))
+        return pool
+
+    def _city_pool(self):
+        return self._pool("cities", self.city_pool_size, self.generator.city)
+
+    def _name_pool(self):
+        return self._pool("names", self.name_pool_size, self.generator.name)
+
+    def city_column(self, n):
+        return random.choices(self._city_pool(), k=n)
+
+    # Choices for the rental providers, kept as tuples so they aren't rebuilt on every call
+    car_types = ("Compact", "Sedan", "SUV", "Convertible", "Pickup", "Minivan", "Luxury")
+    insurance_levels = ("basic", "standard", "premium")
+
     def state_abbr(self):
         return random.choice(self.us_states)
 
@@ -30,40 +70,74 @@ class CustomProvider(BaseProvider):
         # Generates a random flight_id (integer)
         return random.randint(0, 9999999)
 
+    # Column variants of the plain providers: return n values in one call. app.py looks these up as
+    # "<provider>_column" when compiling a batch plan, so a batch draws all its values at once
+    # instead of calling the provider once per document
+    _flight_ids = range(0, 10000000)
+    _flight_codes = tuple("FLT-" + str(i) for i in range(100, 1000))
+    _gates = tuple(letter + str(i) for letter in _UPPER for i in range(1, 11))
+
+    def flight_id_column(self, n):
+        return random.choices(self._flight_ids, k=n)
+
     def random_string(self, length=5):
         # Helper method to create random uppercase string
-        letters = string.ascii_uppercase
-        return ''.join(random.choice(letters) for _ in range(length))
+        return ''.join(random.choices(_UPPER, k=length))
 
     def gate(self):
         # Gate as a letter + number 1-10
-        return random.choice(string.ascii_uppercase) + str(random.randint(1, 10))
+        return random.choice(_UPPER) + str(random.randint(1, 10))
     
     def ticket_number(self):
         # PNR-like ticket: 10 uppercase letters/digits (e.g., M8Y3KQ)
-        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
+        return ''.join(random.choices(_ALNUM, k=10))
+
+    def ticket_numbers(self, n):
+        # n tickets from a single random.choices draw, sliced into 10 character strings
+        chars = ''.join(random.choices(_ALNUM, k=10 * n))
+        return [chars[i:i + 10] for i in range(0, 10 * n, 10)]
 
     def aircraft_and_seats(self):
         # Select plane_type and calculate seats_available and num_passengers
-        plane_type = random.choice(list(self.aircraft_seat_map.keys()))
-        total_seats = self.aircraft_seat_map[plane_type]
+        i = random.randrange(len(self.aircraft_types))
+        plane_type = self.aircraft_types[i]
+        total_seats = self.aircraft_seats[i]
         num_passengers = random.randint(1, min(70, total_seats))
         seats_available = total_seats - num_passengers
         return plane_type, total_seats, num_passengers, seats_available
 
+    def aircraft_and_seats_batch(self, n):
+        # Same as aircraft_and_seats but for n flights at once: the planes are drawn in one
+        # random.choices call and passenger counts with random() instead of randint per flight
+        _random = random.random
+        types, seats, max_passengers = self.aircraft_types, self.aircraft_seats, self.aircraft_max_passengers
+        batch = []
+        for i in random.choices(range(len(types)), k=n):
+            total_seats = seats[i]
+            num_passengers = 1 + int(_random() * max_passengers[i])
+            batch.append((types[i], total_seats, num_passengers, total_seats - num_passengers))
+        return batch
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def seat_numbers(total_seats):
+        # Every seat label for an aircraft size: rows 1..total_seats//3, letters A-F
+        return tuple(str(row) + letter for row in range(1, total_seats // 3 + 1) for letter in "ABCDEF")
+
     def passengers(self, total_seats, num_passengers, fake):
         # Generate passenger list
-        seat_letters = ["A","B","C","D","E","F"]
-        passengers_list = []
-        for idx in range(1, num_passengers + 1):
-            seat_number = str(random.randint(1, total_seats // 3)) + random.choice(seat_letters)
-            passengers_list.append({
+        names = random.choices(self._name_pool(), k=num_passengers)
+        seats = random.choices(self.seat_numbers(total_seats), k=num_passengers)
+        tickets = self.ticket_numbers(num_passengers)
+        return [
+            {
                 "passenger_id": idx,
-                "name": fake.name(),
-                "seat_number": seat_number,
-                "ticket_number": self.ticket_number()
-            })
-        return passengers_list
+                "name": name,
+                "seat_number": seat,
+                "ticket_number": ticket
+            }
+            for idx, name, seat, ticket in zip(range(1, num_passengers + 1), names, seats, tickets)
+        ]
 
     def equip(self, plane_type, total_seats):
         return {
@@ -75,29 +149,35 @@ class CustomProvider(BaseProvider):
     def flight_code(self):
         return "FLT-" + str(random.randint(100, 999))
 
+    def flight_code_column(self, n):
+        return random.choices(self._flight_codes, k=n)
+
+    def gate_column(self, n):
+        # Same distribution as gate(): uniform letter, uniform number
+        return random.choices(self._gates, k=n)
+
     def car_type(self):
-        return random.choice([
-            "Compact", "Sedan", "SUV", "Convertible", "Pickup", "Minivan", "Luxury"
-        ])
+        return random.choice(self.car_types)
 
     def license_plate(self):
-        letters = ''.join(random.choices(string.ascii_uppercase, k=3))
-        numbers = ''.join(random.choices(string.digits, k=4))
+        letters = ''.join(random.choices(_UPPER, k=3))
+        numbers = ''.join(random.choices(_DIGITS, k=4))
         return f"{letters}-{numbers}"
 
     def rental_options(self):
+        # One draw covers all four options: the low 3 bits are the flags and the rest (0-2) the insurance level
+        b = random.randrange(8 * len(self.insurance_levels))
         return {
-            "gps": random.choice([True, False]),
-            "child_seat": random.choice([True, False]),
-            "extra_driver": random.choice([True, False]),
-            "insurance": random.choice(["basic", "standard", "premium"])
+            "gps": bool(b & 1),
+            "child_seat": bool(b & 2),
+            "extra_driver": bool(b & 4),
+            "insurance": self.insurance_levels[b >> 3]
         }
     
     def rental_info(self):
         rental_date = self.generator.date_time_between(start_date='-30d', end_date='now')
         return_date = rental_date + timedelta(days=random.randint(1, 14))
-        pickup_location = self.generator.city()
-        drop_off_location = self.generator.city()
+        pickup_location, drop_off_location = random.choices(self._city_pool(), k=2)
 
         return {
             "rental_date": rental_date,
@@ -111,9 +191,9 @@ class CustomProvider(BaseProvider):
         return [
             {
                 "driver_id": i,
-                "name": self.generator.name(),
+                "name": random.choice(self._name_pool()),
                 "age": random.randint(21, 70),
-                "license_number": ''.join(random.choices(string.ascii_uppercase + string.digits, k=10)),
+                "license_number": ''.join(random.choices(_ALNUM, k=10)),
                 "license_state": self.state_abbr()
             }
             for i in range(1, num_drivers + 1)
@@ -3,8 +3,12 @@ import pymongo
 import json
 import logging
 from bson import json_util
-import copy
 import pprint
+import reprlib
+import re
+import threading
+import functools
+import math
 import args as args_module
 import os
 
@@ -63,45 +67,193 @@ def load_queries_from_path(path):
             
     return all_queries
 
-def _resolve_placeholder(placeholder_value, fake, generate_random_value_func):
-    """
-    Resolves a placeholder by first checking for a known type, then for a provider.
-    """
-    # List of known BSON types from your generate_random_value function
-    known_types = [
-        "string", "int", "double", "bool", "date", "objectId", 
-        "array", "object", "timestamp", "long", "decimal"
-    ]
-
-    # 1. Check if the placeholder is a known BSON type
-    if placeholder_value in known_types:
-        return generate_random_value_func(placeholder_value)
-    
-    # 2. If not a known type, assume it's a Faker provider
-    else:
-        faker_func = getattr(fake, placeholder_value, None)
-        if callable(faker_func):
-            return faker_func()
+# Known BSON types from the generate_random_value function
+_KNOWN_TYPES = frozenset([
+    "string", "int", "double", "bool", "date", "objectId",
+    "array", "object", "timestamp", "long", "decimal"
+])
+
+# A whole string of the form "<name>"
+_PLACEHOLDER_RE = re.compile(r"<([^<>]+)>")
+
+# Per-thread cache of placeholder name -> zero-argument resolver, so the type check and the
+# getattr on fake only happen the first time a thread sees a placeholder
+_resolvers = threading.local()
+
+def _get_resolver(placeholder_value, fake, generate_random_value_func):
+    cache = getattr(_resolvers, "cache", None)
+    if cache is None or _resolvers.fake is not fake:
+        cache = _resolvers.cache = {}
+        _resolvers.fake = fake
+
+    resolver = cache.get(placeholder_value)
+    if resolver is None:
+        # 1. Check if the placeholder is a known BSON type
+        if placeholder_value in _KNOWN_TYPES:
+            resolver = functools.partial(generate_random_value_func, placeholder_value)
+        # 2. If not a known type, assume it's a Faker provider
+        elif callable(getattr(fake, placeholder_value, None)):
+            resolver = getattr(fake, placeholder_value)
+        # 3. If it's neither, log a warning (once per thread) and keep the placeholder
         else:
-            # 3. If it's neither, log a warning and return the placeholder
             logging.warning(f"Unknown type or provider '{placeholder_value}'. Keeping placeholder.")
-            return f"<{placeholder_value}>"
+            resolver = lambda placeholder=f"<{placeholder_value}>": placeholder
+        cache[placeholder_value] = resolver
+    return resolver
 
-def _process_placeholders(data, fake, generate_random_value_func):
+def _resolve_copy(data, resolve):
     """
-    Recursively traverses a data structure to find and replace placeholders.
+    Returns a copy of a data structure with its placeholder values resolved (keys are kept as they are).
     """
-    if isinstance(data, dict):
-        for key, value in data.items():
-            data[key] = _process_placeholders(value, fake, generate_random_value_func)
-    elif isinstance(data, list):
-        for i, item in enumerate(data):
-            data[i] = _process_placeholders(item, fake, generate_random_value_func)
-    elif isinstance(data, str) and data.startswith('<') and data.endswith('>'):
-        placeholder_value = data[1:-1]
-        return _resolve_placeholder(placeholder_value, fake, generate_random_value_func)
-            
-    return data
+    # Explicit stack of (source, copy) containers instead of recursion: no Python frame per node and no
+    # recursion limit on deeply nested pipelines
+    def leaf(value):
+        if isinstance(value, str) and value.startswith("<"):
+            match = _PLACEHOLDER_RE.fullmatch(value)
+            if match:
+                return resolve(match.group(1))
+        return value
+
+    if not isinstance(data, (dict, list)):
+        return leaf(data)
+
+    root = {} if isinstance(data, dict) else []
+    stack = [(data, root)]
+    while stack:
+        source, target = stack.pop()
+        items = source.items() if isinstance(source, dict) else enumerate(source)
+        for key, value in items:
+            if isinstance(value, (dict, list)):
+                value_copy = {} if isinstance(value, dict) else []
+                stack.append((value, value_copy))
+            else:
+                value_copy = leaf(value)
+            if isinstance(target, dict):
+                target[key] = value_copy
+            else:
+                target.append(value_copy)
+
+    return root
+
+#####################################################################
+# Compile each query definition once into a builder made with exec,
+# e.g. for {"filter": {"age": "<int>"}, "limit": 5}:
+#   def _build(resolve):
+#       return {'filter': {'age': resolve('int')}, 'limit': 5}
+# Every call returns a fresh structure (pymongo may add _id to insert
+# documents) with the placeholders resolved, without a deepcopy and a
+# walk of the definition per execution. Definitions too deeply nested
+# to compile use _resolve_copy instead
+#####################################################################
+_LITERAL_TYPES = (str, int, float, bool, type(None))
+_query_builders = {}  # id(query_def) -> (query_def, builder); the definition is kept so its id isn't reused
+
+def _compile_query(query_def):
+    constants = {}
+
+    def literal(data):
+        if type(data) in _LITERAL_TYPES and not (type(data) is float and not math.isfinite(data)):
+            return repr(data)
+        # Other leaves (datetime, ObjectId... from json_util) are bound by reference
+        name = f"_c{len(constants)}"
+        constants[name] = data
+        return name
+
+    def expression(data):
+        # Only values are resolved; keys are always emitted as they are, even if they look like a placeholder
+        if isinstance(data, dict):
+            return "{" + ", ".join(f"{literal(key)}: {expression(value)}" for key, value in data.items()) + "}"
+        if isinstance(data, list):
+            return "[" + ", ".join(expression(item) for item in data) + "]"
+        if isinstance(data, str):
+            match = _PLACEHOLDER_RE.fullmatch(data)
+            if match:
+                return f"resolve({match.group(1)!r})"
+        return literal(data)
+
+    source = f"def _build(resolve):\n    return {expression(query_def)}"
+    exec(compile(source, "<query builder>", "exec"), constants)
+    return constants["_build"]
+
+def _build_query(query_def, fake, generate_random_value_func):
+    entry = _query_builders.get(id(query_def))
+    if entry is None or entry[0] is not query_def:
+        try:
+            builder = _compile_query(query_def)
+        except (SyntaxError, RecursionError, MemoryError) as e:
+            # e.g. "too many nested parentheses" past ~200 levels of nesting
+            logging.debug(f"Query definition could not be compiled ({e}); resolving it at runtime instead.")
+            builder = functools.partial(_resolve_copy, query_def)
+        entry = _query_builders[id(query_def)] = (query_def, builder)
+    return entry[1](lambda name: _get_resolver(name, fake, generate_random_value_func)())
+
+# Write operations that can be sent as part of a client bulk write: operation -> (op_type, model factory)
+_WRITE_MODELS = {
+    "insertOne": ("insert", lambda q, ns: pymongo.InsertOne(q["document"], namespace=ns)),
+    "updateOne": ("update", lambda q, ns: pymongo.UpdateOne(q["filter"], q["update"], namespace=ns)),
+    "updateMany": ("update", lambda q, ns: pymongo.UpdateMany(q["filter"], q["update"], namespace=ns)),
+    "deleteOne": ("delete", lambda q, ns: pymongo.DeleteOne(q["filter"], namespace=ns)),
+    "deleteMany": ("delete", lambda q, ns: pymongo.DeleteMany(q["filter"], namespace=ns)),
+}
+
+def build_write_model(query_def, fake, generate_random_value_func):
+    """
+    Processes placeholders and turns a user-defined write query into a pymongo write model
+    for a client bulk write, instead of executing it right away.
+
+    Returns:
+        tuple: (operation_type, namespace, model), or (None, None, None) if the query is not a valid write.
+    """
+    processed_query, operation = query_def, None
+    try:
+        processed_query = _build_query(query_def, fake, generate_random_value_func)
+
+        db_name = processed_query.get("database")
+        collection_name = processed_query.get("collection")
+        operation = processed_query.get("operation")
+
+        if not all([db_name, collection_name, operation]):
+            logging.warning(f"Skipping invalid query (missing db, collection, or operation): {processed_query}")
+            return None, None, None
+
+        if operation not in _WRITE_MODELS:
+            logging.warning(f"Unsupported bulk write operation '{operation}' in query file.")
+            return None, None, None
+
+        op_type, make_model = _WRITE_MODELS[operation]
+        namespace = f"{db_name}.{collection_name}"
+        return op_type, namespace, make_model(processed_query, namespace)
+    except KeyError as e:
+        logging.error(f"Missing key '{e}' in query definition for operation '{operation}': {processed_query}")
+    except Exception as e:
+        logging.error(f"Unexpected error building user write {processed_query}: {e}")
+    return None, None, None
+
+# Results of user finds and aggregations are only counted outside debug mode: stream them in batches
+# of QUERY_BATCH_SIZE as undecoded RawBSONDocuments instead of decoding and keeping the whole result set
+QUERY_BATCH_SIZE = 1000
+
+def _read_collection(args, collection):
+    return collection if args.debug else mongo_client.get_raw_collection(collection.database.name, collection.name)
+
+def _consume_cursor(args, cursor):
+    """
+    Returns (results, count) for a cursor; results are only kept in debug mode, for logging.
+    """
+    if args.debug:
+        results = list(cursor)
+        return results, len(results)
+    count = 0
+    for _ in cursor.batch_size(QUERY_BATCH_SIZE):
+        count += 1
+    return None, count
+
+# Truncated repr for logging query results in debug mode
+_result_repr = reprlib.Repr()
+_result_repr.maxlist = 10
+_result_repr.maxdict = 10
+_result_repr.maxstring = 200
+_result_repr.maxother = 200
 
 def execute_user_query(args, query_def, fake, generate_random_value_func):
     """
@@ -115,42 +267,45 @@ def execute_user_query(args, query_def, fake, generate_random_value_func):
     Returns:
         tuple: (operation_type, operation_count, documents_affected).
     """
-    processed_query = copy.deepcopy(query_def)
-    _process_placeholders(processed_query, fake, generate_random_value_func)
+    # Built inside the try, so a definition that fails to compile or resolve is logged instead of
+    # ending the worker thread
+    processed_query, operation = query_def, None
+    try:
+        processed_query = _build_query(query_def, fake, generate_random_value_func)
 
-    client = mongo_client.get_client()
-    db_name = processed_query.get("database")
-    collection_name = processed_query.get("collection")
-    operation = processed_query.get("operation")
+        db_name = processed_query.get("database")
+        collection_name = processed_query.get("collection")
+        operation = processed_query.get("operation")
 
-    if not all([db_name, collection_name, operation]):
-        logging.warning(f"Skipping invalid query (missing db, collection, or operation): {processed_query}")
-        return None, 0, 0
+        if not all([db_name, collection_name, operation]):
+            logging.warning(f"Skipping invalid query (missing db, collection, or operation): {processed_query}")
+            return None, 0, 0
 
-    # --- DEBUG LOGGING FOR USER QUERIES ---
-    if args.debug:
-        # ---- ADD THIS LINE FOR DIAGNOSTICS ----
-        # logging.debug(f"Executing query on client connected to: {client.HOST}:{client.PORT}")
-        # ---------------------------------------
+        # Only build the debug output if a DEBUG record would actually be emitted
+        log_debug = args.debug and logging.getLogger().isEnabledFor(logging.DEBUG)
+
+        # --- DEBUG LOGGING FOR USER QUERIES ---
+        if log_debug:
+            # ---- ADD THIS LINE FOR DIAGNOSTICS ----
+            # logging.debug(f"Executing query on client connected to: {client.HOST}:{client.PORT}")
+            # ---------------------------------------
         
-        logging.debug(f"\n--- [DEBUG] Running USER QUERY on: {db_name}.{collection_name} ---")
-        logging.debug(f"Operation: {operation}")
-        for key, value in processed_query.items():
-            if key not in ["database", "collection", "operation"]:
-                logging.debug(f"{key.capitalize()}: {pprint.pformat(value)}")
+            logging.debug(f"\n--- [DEBUG] Running USER QUERY on: {db_name}.{collection_name} ---")
+            logging.debug(f"Operation: {operation}")
+            for key, value in processed_query.items():
+                if key not in ["database", "collection", "operation"]:
+                    logging.debug(f"{key.capitalize()}: {pprint.pformat(value)}")
 
-    collection = client[db_name][collection_name]
-    op_type, docs_affected = None, 0
+        collection = mongo_client.get_collection(db_name, collection_name)
+        op_type, docs_affected = None, 0
 
-    try:
         results = None
         if operation == "find":
             op_type = "select"
-            cursor = collection.find(processed_query.get("filter", {}), processed_query.get("projection"))
+            cursor = _read_collection(args, collection).find(processed_query.get("filter", {}), processed_query.get("projection"))
             if "limit" in processed_query:
                 cursor = cursor.limit(processed_query["limit"])
-            results = list(cursor)
-            docs_affected = len(results)
+            results, docs_affected = _consume_cursor(args, cursor)
 
         elif operation == "insertOne":
             op_type = "insert"
@@ -184,16 +339,18 @@ def execute_user_query(args, query_def, fake, generate_random_value_func):
 
         elif operation == "aggregate":
             op_type = "select"
-            cursor = collection.aggregate(processed_query["pipeline"])
-            results = list(cursor)
-            docs_affected = len(results)
+            # "allowDiskUse": true in the query definition lets large $group/$sort stages spill to disk
+            aggregate_options = {"allowDiskUse": processed_query["allowDiskUse"]} if "allowDiskUse" in processed_query else {}
+            cursor = _read_collection(args, collection).aggregate(processed_query["pipeline"], batchSize=QUERY_BATCH_SIZE, **aggregate_options)
+            results, docs_affected = _consume_cursor(args, cursor)
 
         else:
             logging.warning(f"Unsupported operation '{operation}' in query file.")
             return None, 0, 0
         
-        if args.debug:
-            logging.debug(f"Result: {pprint.pformat(results)}")
+        if log_debug:
+            # Results can be a whole find; reprlib caps the output instead of formatting every document
+            logging.debug("Result: %s", _result_repr.repr(results))
             logging.debug("---------------------------------------------------\n")
 
         return op_type, 1, docs_affected
@@ -1,31 +1,98 @@
 # logger.py
+import atexit
 import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
 import sys
 
+# Rotate the log file once it reaches LOG_MAX_BYTES, keeping LOG_BACKUP_COUNT old files
+LOG_MAX_BYTES = 100 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+_listener = None
+_queue_handler = None
+# Forked children (e.g. the total ops logger process) log through a multiprocessing queue that a second
+# listener in the parent drains, so only the parent ever writes to (and rotates) the log file
+_child_listener = None
+_child_queue = None
+
 def configure_logging(log_file=None, level=logging.INFO):
     """
     Configures logging to stream to stdout and optionally to a file.
 
+    Records are handed to a QueueHandler, and a QueueListener thread does the formatting and
+    the I/O, so threads that log never wait on the console or the disk.
+
     Args:
         log_file (str, optional): Path to the log file. Defaults to None.
         level (int, optional): The logging level to set. Defaults to logging.INFO.
     """
+    global _listener, _queue_handler, _child_listener, _child_queue
+
     handlers = [logging.StreamHandler(sys.stdout)]
-    
+
     if log_file:
-        handlers.append(logging.FileHandler(log_file, mode="a"))
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, mode="a", maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT
+        ))
+
+    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    # Replace any listeners from a previous call
+    stop_logging()
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _child_queue = multiprocessing.Queue()
+    _child_listener = logging.handlers.QueueListener(_child_queue, *handlers, respect_handler_level=True)
+    _child_listener.start()
+
+    # The queue handler only merges the message arguments; the listener's handlers apply the format
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _queue_handler.setFormatter(logging.Formatter("%(message)s"))
 
     # Use the 'level' parameter to configure the root logger
     logging.basicConfig(
         level=level,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-        handlers=handlers,
-        force=True 
+        handlers=[_queue_handler],
+        force=True
     )
 
     # ---- HIDE PYMONGO DEBUG MESSAGES ----
     # After setting our app's level, raise the level for the noisy
     # pymongo library to WARNING, so we only see its serious errors.
     logging.getLogger("pymongo").setLevel(logging.WARNING)
-    # ----------------------------------------------------    
\ No newline at end of file
+    # ----------------------------------------------------
+
+def stop_logging():
+    """
+    Flushes the queued records and stops the listener threads.
+    """
+    global _listener, _child_listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+    if _child_listener:
+        _child_listener.stop()
+        _child_listener = None
+
+def _log_to_parent_in_child():
+    # A forked child inherits the queue handler but not the listener threads. Send its records to the
+    # parent's child listener instead; the multiprocessing queue is flushed when the child process exits
+    global _listener, _queue_handler, _child_listener
+    if _listener:
+        root = logging.getLogger()
+        root.removeHandler(_queue_handler)
+        _queue_handler = logging.handlers.QueueHandler(_child_queue)
+        _queue_handler.setFormatter(logging.Formatter("%(message)s"))
+        root.addHandler(_queue_handler)
+        # The listeners belong to the parent; the child must not stop them
+        _listener = _child_listener = None
+
+# Make sure queued records are written out before the interpreter exits
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_log_to_parent_in_child)
@@ -1,15 +1,25 @@
 #!/usr/bin/env python3
 import pymongo # type: ignore
+from bson.raw_bson import DEFAULT_RAW_BSON_OPTIONS
 import logging
 import sys
-from urllib.parse import urlencode
 import threading
 import os
 import importlib.util
+import functools
 
-# Use thread-local storage to ensure a separate client per worker process.
-local_data = threading.local()
+# One client per process, shared by all of that process's worker threads (MongoClient is thread-safe
+# and pools connections itself). It is dropped in forked children (see _reset_after_fork) so a child
+# never reuses its parent's client
+_client = None
+_client_lock = threading.Lock()
 
+# Extra MongoClient keyword arguments for the clients created in this process, e.g. maxPoolSize.
+# Options set in mongodbCreds.py take precedence
+client_options = {}
+
+# The config and URI don't change during a run, so each process loads and builds them only once
+@functools.lru_cache(maxsize=None)
 def _load_creds_explicitly():
     """
     Loads the dbconfig from a specific file path to avoid import issues.
@@ -31,13 +41,38 @@ def _load_creds_explicitly():
     
     return mongodb_creds.dbconfig
 
-def _create_new_client():
+# dbconfig keys used to build the host list rather than passed to MongoClient as options
+_NON_CLIENT_OPTION_KEYS = frozenset({"atlas", "hosts", "port"})
+
+# Options that may be written as strings in mongodbCreds.py (e.g. "tls": "false") but are
+# passed to MongoClient with their native type
+_BOOL_OPTIONS = frozenset({"tls", "ssl", "retryWrites", "retryReads", "directConnection", "journal",
+                           "tlsInsecure", "tlsAllowInvalidCertificates", "tlsAllowInvalidHostnames"})
+_INT_OPTIONS = frozenset({"serverSelectionTimeoutMS", "connectTimeoutMS", "socketTimeoutMS", "maxPoolSize",
+                          "minPoolSize", "maxIdleTimeMS", "waitQueueTimeoutMS", "localThresholdMS",
+                          "heartbeatFrequencyMS", "maxConnecting"})
+
+def _normalize_option(key, value):
+    if key in _BOOL_OPTIONS and isinstance(value, str):
+        return value.strip().lower() == "true"
+    if key in _INT_OPTIONS and isinstance(value, str):
+        return int(value)
+    return value
+
+@functools.lru_cache(maxsize=None)
+def _client_config():
     """
-    An internal function that builds the connection URI and returns a new client.
+    Builds the connection URI and the MongoClient keyword options from dbconfig.
+
+    Returns:
+        tuple: (connection_uri, options). Only the hosts go in the URI; credentials and every
+        other setting are passed as typed keyword arguments, so nothing needs URL escaping.
     """
-    # Load credentials using the new explicit method.
     dbconfig = _load_creds_explicitly()
 
+    if dbconfig.get("atlas"):
+        return f"{dbconfig['atlas']}", {}
+
     port = dbconfig.get("port")
     # If port is defined and non-empty, append it to each host; otherwise assume port is embedded in host string
     if port:
@@ -45,49 +80,113 @@ def _create_new_client():
     else:
         hosts = ",".join(dbconfig["hosts"])
 
-    if dbconfig.get("atlas"):
-        connection_uri = f"{dbconfig['atlas']}"
-        return pymongo.MongoClient(connection_uri)
-    elif dbconfig.get("username") and dbconfig.get("password"):
-        connection_uri = f"mongodb://{dbconfig['username']}:{dbconfig['password']}@{hosts}"
-    else:
-        connection_uri = f"mongodb://{hosts}"
+    # Only options pymongo knows and accepts are passed on; MongoClient raises on anything else, so
+    # unknown keys and invalid values are skipped with a warning instead of failing the connection
+    options = {}
+    for key, value in dbconfig.items():
+        if key in _NON_CLIENT_OPTION_KEYS or value is None:
+            continue
+        try:
+            value = _normalize_option(key, value)
+            pymongo.common.validate(key, value)
+        except (pymongo.errors.ConfigurationError, ValueError, TypeError) as e:
+            logging.warning(f"Ignoring dbconfig option '{key}': {e}")
+            continue
+        options[key] = value
+    # Credentials are only used when both are set
+    if not (options.get("username") and options.get("password")):
+        options.pop("username", None)
+        options.pop("password", None)
 
-    conn_params = {
-        key: str(value)
-        for key, value in dbconfig.items()
-        if key not in {"hosts", "username", "password", "port"} and value is not None
-    }
-    if conn_params:
-        connection_uri += "/?" + urlencode(conn_params)
+    return f"mongodb://{hosts}", options
+
+def _create_new_client():
+    """
+    An internal function that returns a new client for the cached connection settings.
+    """
+    connection_uri, config_options = _client_config()
+    # Options set in mongodbCreds.py take precedence over the defaults in client_options
+    return pymongo.MongoClient(connection_uri, **{**client_options, **config_options})
 
-    return pymongo.MongoClient(connection_uri)
+_checked_pid = None
 
 def init():
     """
-    Performs a one-time connection check from the main process.
+    Performs a one-time connection check per process.
     """
+    # Several modules call init() on import; only the first call in each process pings. The check uses
+    # a short-lived client so the shared one is still created lazily (with client_options) by get_client()
+    global _checked_pid
+    if _checked_pid == os.getpid():
+        return
     try:
-        client = _create_new_client()
-        client.admin.command('ping')
+        with _create_new_client() as client:
+            client.admin.command('ping')
         logging.debug("MongoDB connection credentials appear to be valid.") 
     except Exception as e:
         logging.fatal(f"Unable to connect to MongoDB. Please check your config.\nError: {e}")
         sys.exit(1)
+    _checked_pid = os.getpid()
 
 def get_client():
     """
     Returns a process-safe MongoClient instance.
     """
-    if not hasattr(local_data, "client"):
-        pid = os.getpid()
-        logging.debug(f"Process {pid} is creating a new MongoClient.")
-        local_data.client = _create_new_client()
-    
-    return local_data.client
+    # This runs on every operation, so the common case is a single global read
+    global _client
+    client = _client
+    if client is None:
+        with _client_lock:
+            client = _client
+            if client is None:
+                logging.debug(f"Process {os.getpid()} is creating a new MongoClient.")
+                client = _client = _create_new_client()
+
+    return client
+
+def _reset_after_fork():
+    # The parent's client (and its sockets) must not be used by a forked child, and the lock may have
+    # been held by another parent thread at fork time
+    global _client, _client_lock
+    _client = None
+    _client_lock = threading.Lock()
+    _collections.clear()
+    _raw_collections.clear()
+
+# Collection handles by (db, collection). pymongo builds new Database and Collection objects on every
+# client[db][coll], so the per-operation paths reuse these instead (they're tied to this process' client)
+_collections = {}
+
+def get_collection(db_name, collection_name):
+    """
+    Returns a cached handle for db_name.collection_name on the process-local client.
+    """
+    client = get_client()
+    collection = _collections.get((db_name, collection_name))
+    if collection is None or collection.database.client is not client:
+        collection = _collections[(db_name, collection_name)] = client[db_name][collection_name]
+    return collection
+
+# Views of the cached handles that return documents as RawBSONDocument (undecoded bytes). with_options()
+# builds a new Collection each time, so the read paths that only count results reuse these
+_raw_collections = {}
+
+def get_raw_collection(db_name, collection_name):
+    """
+    Returns a cached RawBSONDocument view of db_name.collection_name on the process-local client.
+    """
+    collection = get_collection(db_name, collection_name)
+    raw_collection = _raw_collections.get((db_name, collection_name))
+    if raw_collection is None or raw_collection.database.client is not collection.database.client:
+        raw_collection = _raw_collections[(db_name, collection_name)] = collection.with_options(
+            codec_options=DEFAULT_RAW_BSON_OPTIONS
+        )
+    return raw_collection
 
 def get_db():
     """
     Returns a specific database handle from the process-local client.
     """
     return get_client()["config"]
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -1,152 +1,236 @@
 import random
+import functools
 # This file generates dynamic queries for the workload. You can add new query formats to the appropriate function and they'll be randomly chosen
 # while the workload is running. 
 # The queries below have a mix of "optimized" and "ineffective" queries. The good queries always use the primary/shard key 
 # The slow queries do not use the primary/shard key (on purpose) in order to create workload that's not optimal
 
 # SELECT queries
-def select_queries(param_list, field_names, field_types):
-    """
-    Generate lists of optimized and ineffective select queries.
-    """
-    optimized_queries = []
-    ineffective_queries = []
-    query_projections = []
-
-    if not param_list or not field_names or len(param_list) != len(field_names) or len(field_types) != len(field_names):
-        return [], [], []
-
-    pk_value = param_list[0]
+# The query shapes only depend on the schema (field names and types), so they are built once per schema
+# as templates and cached. Optimized templates are called as template(pk_value, value, high_value) and
+# ineffective ones as template(value, high_value); only the values change from one call to the next.
+# The templates are kept in flat (field index, template) lists, so each call builds its query lists
+# with a single comprehension instead of growing them field by field.
+# To add a new query format, add a template to the appropriate branch below.
+_HIGH_VALUE_OFFSETS = range(1, 100001)
+
+@functools.lru_cache(maxsize=1024)
+def _select_templates(field_names, field_types):
     pk_field = field_names[0]
+    # Base queries
+    optimized_templates = [(0, lambda pk, v, hv: {pk_field: pk})]
+    ineffective_templates = [(0, lambda v, hv: {pk_field: {"$exists": True}})]
+    numeric_fields = []  # indexes of the fields that need a high value
+    query_projections = [{pk_field: 1, "_id": 0}]
 
-    for i in range(1, len(param_list)):
+    for i in range(1, len(field_names)):
         field = field_names[i]
-        value = param_list[i]
         bson_type = field_types[i]
+        numeric = bson_type in ["int", "long", "double", "decimal"]
 
         # OPTIMIZED queries always include PK
-        base_query = {pk_field: pk_value}
-        
-        if bson_type in ["int", "long", "double", "decimal"]:
-            # Generate a high value to be used by gte lte queries:
-            increment = random.randint(1, 100000)  # Random int between 1 and 100000
-            high_value = value + increment
+        if numeric:
             # Numeric range queries
-            optimized_queries.append({**base_query, field: value})
-            optimized_queries.append({**base_query, field: {"$gt": value}})
-            optimized_queries.append({**base_query, field: {"$lt": value}})
-            optimized_queries.append({**base_query, field: {"$gte": value, "$lte": high_value}})
-
-            ineffective_queries.append({field: value})
-            ineffective_queries.append({field: {"$gt": value}})
-            ineffective_queries.append({field: {"$lt": value}})
-            ineffective_queries.append({field: {"$gte": value, "$lte": high_value}})
+            optimized = [
+                lambda pk, v, hv, field=field: {pk_field: pk, field: v},
+                lambda pk, v, hv, field=field: {pk_field: pk, field: {"$gt": v}},
+                lambda pk, v, hv, field=field: {pk_field: pk, field: {"$lt": v}},
+                lambda pk, v, hv, field=field: {pk_field: pk, field: {"$gte": v, "$lte": hv}},
+            ]
+            ineffective = [
+                lambda v, hv, field=field: {field: v},
+                lambda v, hv, field=field: {field: {"$gt": v}},
+                lambda v, hv, field=field: {field: {"$lt": v}},
+                lambda v, hv, field=field: {field: {"$gte": v, "$lte": hv}},
+            ]
 
         elif bson_type == "string":
-            optimized_queries.append({**base_query, field: value})
-            optimized_queries.append({**base_query, field: {"$regex": value}})
-            
-            ineffective_queries.append({field: value})
-            ineffective_queries.append({field: {"$regex": value}})
-
-        elif bson_type == "bool":
-            optimized_queries.append({**base_query, field: value})
-            ineffective_queries.append({field: value})
-
-        elif bson_type in ["date", "timestamp"]:
-            optimized_queries.append({**base_query, field: value})
-            ineffective_queries.append({field: value})
+            optimized = [
+                lambda pk, v, hv, field=field: {pk_field: pk, field: v},
+                lambda pk, v, hv, field=field: {pk_field: pk, field: {"$regex": v}},
+            ]
+            ineffective = [
+                lambda v, hv, field=field: {field: v},
+                lambda v, hv, field=field: {field: {"$regex": v}},
+            ]
 
         elif bson_type == "objectId":
-            optimized_queries.append({**base_query, field: value})
+            optimized = [lambda pk, v, hv, field=field: {pk_field: pk, field: v}]
+            ineffective = []
 
         elif bson_type == "array":
-            optimized_queries.append({**base_query, field: {"$in": value}})
-            ineffective_queries.append({field: {"$in": value}})
+            optimized = [lambda pk, v, hv, field=field: {pk_field: pk, field: {"$in": v}}]
+            ineffective = [lambda v, hv, field=field: {field: {"$in": v}}]
 
         else:
-            # Fallback to exact match
-            optimized_queries.append({**base_query, field: value})
-            ineffective_queries.append({field: value})
-
+            # bool, date, timestamp and any other type: exact match
+            optimized = [lambda pk, v, hv, field=field: {pk_field: pk, field: v}]
+            ineffective = [lambda v, hv, field=field: {field: v}]
+
+        if numeric:
+            numeric_fields.append(i)
+        optimized_templates.extend((i, template) for template in optimized)
+        ineffective_templates.extend((i, template) for template in ineffective)
         # projection for the field and pk
         query_projections.append({pk_field: 1, field: 1, "_id": 0})
 
-    # Base queries
-    optimized_queries.insert(0, {pk_field: pk_value})
-    ineffective_queries.insert(0, {pk_field: {"$exists": True}})
-    query_projections.insert(0, {pk_field: 1, "_id": 0})
+    return optimized_templates, ineffective_templates, numeric_fields, tuple(query_projections)
 
+def select_queries(param_list, field_names, field_types):
+    """
+    Generate lists of optimized and ineffective select queries.
+    """
+    if not param_list or not field_names or len(param_list) != len(field_names) or len(field_types) != len(field_names):
+        return [], [], []
+
+    pk_value = param_list[0]
+    optimized_templates, ineffective_templates, numeric_fields, query_projections = _select_templates(
+        tuple(field_names), tuple(field_types)
+    )
+
+    # Generate the high values used by gte lte queries (random int between 1 and 100000 above value),
+    # drawing the offsets for every numeric field at once
+    high_values = [None] * len(param_list)
+    if numeric_fields:
+        for i, offset in zip(numeric_fields, random.choices(_HIGH_VALUE_OFFSETS, k=len(numeric_fields))):
+            high_values[i] = param_list[i] + offset
+
+    optimized_queries = [template(pk_value, param_list[i], high_values[i]) for i, template in optimized_templates]
+    ineffective_queries = [template(param_list[i], high_values[i]) for i, template in ineffective_templates]
+
+    # The projections are the cached ones, shared across calls; callers only read them
     return optimized_queries, ineffective_queries, query_projections
 
+def pick_select_query(param_list, field_names, field_types, optimized):
+    """
+    Pick one random select query, optimized or ineffective, and its projection.
+
+    Same distribution as random.choice over the lists select_queries returns, but only the chosen query
+    is built. Ineffective queries are paired with the projection at the same index, or None.
+    Returns (None, None) if the inputs are invalid.
+    """
+    if not param_list or not field_names or len(param_list) != len(field_names) or len(field_types) != len(field_names):
+        return None, None
+
+    optimized_templates, ineffective_templates, numeric_fields, query_projections = _select_templates(
+        tuple(field_names), tuple(field_types)
+    )
+    templates = optimized_templates if optimized else ineffective_templates
+    query_index = random.randrange(len(templates))
+    i, template = templates[query_index]
+    value = param_list[i]
+    high_value = value + random.randint(1, 100000) if i in numeric_fields else None
+
+    if optimized:
+        return template(param_list[0], value, high_value), None
+    projection = query_projections[query_index] if query_index < len(query_projections) else None
+    return template(value, high_value), projection
+
 # UPDATE queries
+# Updates touch a random subset of the fields, so the templates are cached per (field, type) rather than
+# per field list, and the sampled fields' templates are combined at call time. A template is called as
+# template(value) and returns the field's update operations.
+@functools.lru_cache(maxsize=1024)
+def _update_template(field, ftype):
+    if ftype in ["int", "long", "double", "decimal"]:
+        return lambda v: ({"$set": {field: v}}, {"$inc": {field: random.randint(1, 100)}})
+
+    if ftype == "bool":
+        return lambda v: (
+            ({"$set": {field: not v}}, {"$set": {field: v}}) if isinstance(v, bool)
+            else ({"$set": {field: bool(v)}},)
+        )
+
+    if ftype == "array":
+        return lambda v: (
+            {"$set": {field: v}},
+            {"$push": {field: {"$each": v if isinstance(v, list) else [v]}}},
+        )
+
+    # string, date, timestamp, objectId and any other type
+    return lambda v: ({"$set": {field: v}},)
+
 def update_queries(field_names, values, field_types, primary_key, pk_value):
     """
     Generate lists of optimized and ineffective update queries.
     Each query dict contains "filter" and "update" keys.
     """
-    optimized_updates = []
-    ineffective_updates = []
-
     if not (field_names and values and field_types) or not (len(field_names) == len(values) == len(field_types)):
         return [], []
 
+    # Every template returns operator documents, so the ops are used as they are. All queries of a kind
+    # share one filter dict; callers only read it
+    update_ops = [
+        update_op
+        for field, value, ftype in zip(field_names, values, field_types)
+        if value is not None
+        for update_op in _update_template(field, ftype)(value)
+    ]
+    optimized_filter = {primary_key: pk_value}
+    ineffective_filter = {}  # No primary key filter
+
+    optimized_updates = [{"filter": optimized_filter, "update": update_op} for update_op in update_ops]
+    ineffective_updates = [{"filter": ineffective_filter, "update": update_op} for update_op in update_ops]
+
+    return optimized_updates, ineffective_updates
+
+
+# DELETE queries
+# Cached per (fields, types, primary key) like the select templates. Optimized templates are called as
+# template(pk_value, value) and ineffective ones as template(value), from flat (field index, template) lists.
+@functools.lru_cache(maxsize=1024)
+def _delete_templates(field_names, field_types, pk_field):
+    # Always add a simple primary key only delete to optimized queries, and an empty filter
+    # for ineffective for delete_many. They don't use a field value, so their index is only a placeholder
+    optimized_templates = [(0, lambda pk, v: {pk_field: pk})]
+    ineffective_templates = [(0, lambda v: {})]
+
     for i in range(len(field_names)):
         field = field_names[i]
-        value = values[i]
         ftype = field_types[i]
 
-        if value is None:
+        # Skip the primary key field itself, it's covered by the primary key only delete
+        if field == pk_field:
             continue
 
-        updates_for_field = []
-
         if ftype in ["int", "long", "double", "decimal"]:
-            updates_for_field.append({"$set": {field: value}})
-            increment = random.randint(1, 100)
-            updates_for_field.append({"$inc": {field: increment}})
+            # Numeric exact and range deletes
+            optimized = [
+                lambda pk, v, field=field: {pk_field: pk, field: v},
+                lambda pk, v, field=field: {pk_field: pk, field: {"$gt": v}},
+                lambda pk, v, field=field: {pk_field: pk, field: {"$lt": v}},
+            ]
+            ineffective = [
+                lambda v, field=field: {field: v},
+                lambda v, field=field: {field: {"$gt": v}},
+                lambda v, field=field: {field: {"$lt": v}},
+            ]
 
         elif ftype == "string":
-            updates_for_field.append({"$set": {field: value}})
-
-        elif ftype == "bool":
-            if isinstance(value, bool):
-                updates_for_field.append({"$set": {field: not value}})
-                updates_for_field.append({"$set": {field: value}})
-            else:
-                updates_for_field.append({"$set": {field: bool(value)}})
-
-        elif ftype in ["date", "timestamp"]:
-            updates_for_field.append({"$set": {field: value}})
+            # String exact and regex deletes
+            optimized = [
+                lambda pk, v, field=field: {pk_field: pk, field: v},
+                lambda pk, v, field=field: {pk_field: pk, field: {"$regex": v}},
+            ]
+            ineffective = [
+                lambda v, field=field: {field: v},
+                lambda v, field=field: {field: {"$regex": v}},
+            ]
 
         elif ftype == "array":
-            updates_for_field.append({"$set": {field: value}})
-            updates_for_field.append({"$push": {field: {"$each": value if isinstance(value, list) else [value]}}})
-
-        elif ftype == "objectId":
-            updates_for_field.append({"$set": {field: value}})
+            # A value that isn't a non-empty list is treated as a single item for $in
+            optimized = [lambda pk, v, field=field: {pk_field: pk, field: {"$in": v if isinstance(v, list) and v else [v]}}]
+            ineffective = [lambda v, field=field: {field: {"$in": v if isinstance(v, list) and v else [v]}}]
 
         else:
-            updates_for_field.append({"$set": {field: value}})
+            # bool, date, timestamp, objectId and any other type: exact match
+            optimized = [lambda pk, v, field=field: {pk_field: pk, field: v}]
+            ineffective = [lambda v, field=field: {field: v}]
 
-        # Build optimized and ineffective update queries with filters
-        for update_op in updates_for_field:
-            # Defensive: ensure update operators exist
-            if not any(k.startswith("$") for k in update_op.keys()):
-                update_op = {"$set": update_op}
-
-            optimized_updates.append({
-                "filter": {primary_key: pk_value},
-                "update": update_op
-            })
-
-            ineffective_updates.append({
-                "filter": {},  # No primary key filter
-                "update": update_op
-            })
-
-    return optimized_updates, ineffective_updates
+        optimized_templates.extend((i, template) for template in optimized)
+        ineffective_templates.extend((i, template) for template in ineffective)
 
+    return optimized_templates, ineffective_templates
 
 def delete_queries(param_list, field_names, field_types, primary_key_name, primary_key_value): # Added pk_name, pk_value
     """
@@ -154,9 +238,6 @@ def delete_queries(param_list, field_names, field_types, primary_key_name, prima
     Optimized queries always include the primary key.
     Ineffective queries omit the primary key.
     """
-    optimized_queries = []
-    ineffective_queries = []
-
     if not param_list or not field_names or not field_types or \
        len(param_list) != len(field_names) or len(field_types) != len(field_names):
         return [], []
@@ -166,84 +247,26 @@ def delete_queries(param_list, field_names, field_types, primary_key_name, prima
     pk_field = primary_key_name
     pk_value = primary_key_value
 
-    # Always add a simple primary key only delete to optimized queries
-    optimized_queries.append({pk_field: pk_value})
-    # Add an empty filter for ineffective for delete_many
-    ineffective_queries.append({})
-
-
-    # Iterate through other fields to create more specific queries
-    # We use field_names directly, param_list contains values in the same order
-    for i in range(len(field_names)):
-        field = field_names[i]
-        value = param_list[i] # param_list has the values
-        ftype = field_types[i]
-
-        # Skip the primary key field itself as it's handled above or by direct filters
-        if field == pk_field:
-            continue
-
-        # Base for optimized queries: always include the primary key
-        optimized_base_filter = {pk_field: pk_value}
+    optimized_templates, ineffective_templates = _delete_templates(tuple(field_names), tuple(field_types), pk_field)
 
-        if ftype in ["int", "long", "double", "decimal"]:
-            # Optimized numeric exact and range deletes
-            optimized_queries.append({**optimized_base_filter, field: value})
-            optimized_queries.append({**optimized_base_filter, field: {"$gt": value}})
-            optimized_queries.append({**optimized_base_filter, field: {"$lt": value}})
-
-            # Ineffective numeric deletes (no primary key)
-            ineffective_queries.append({field: value})
-            ineffective_queries.append({field: {"$gt": value}})
-            ineffective_queries.append({field: {"$lt": value}})
-
-        elif ftype == "string":
-            # Optimized string exact and regex deletes
-            optimized_queries.append({**optimized_base_filter, field: value})
-            optimized_queries.append({**optimized_base_filter, field: {"$regex": value}})
-
-            # Ineffective string deletes (no primary key)
-            ineffective_queries.append({field: value})
-            ineffective_queries.append({field: {"$regex": value}})
-
-        elif ftype == "bool":
-            # Optimized boolean exact match
-            optimized_queries.append({**optimized_base_filter, field: value})
-
-            # Ineffective boolean exact match
-            ineffective_queries.append({field: value})
-
-        elif ftype in ["date", "timestamp"]:
-            # Optimized date exact match
-            optimized_queries.append({**optimized_base_filter, field: value})
-
-            # Ineffective date exact match
-            ineffective_queries.append({field: value})
-
-        elif ftype == "objectId":
-            # Optimized ObjectId exact match
-            optimized_queries.append({**optimized_base_filter, field: value})
-
-            # Ineffective ObjectId exact match
-            ineffective_queries.append({field: value}) # Still want these for non-optimized runs
-
-        elif ftype == "array":
-            # Optimized array deletes
-            if isinstance(value, list) and value: # Ensure value is a non-empty list
-                 optimized_queries.append({**optimized_base_filter, field: {"$in": value}})
-            else: # If not a list, treat as single item for $in
-                 optimized_queries.append({**optimized_base_filter, field: {"$in": [value]}})
-
-            # Ineffective array deletes
-            if isinstance(value, list) and value:
-                ineffective_queries.append({field: {"$in": value}})
-            else:
-                ineffective_queries.append({field: {"$in": [value]}})
-
-        else:
-            # Fallback exact match for other types
-            optimized_queries.append({**optimized_base_filter, field: value})
-            ineffective_queries.append({field: value})
+    # param_list has the values, in the same order as field_names
+    optimized_queries = [template(pk_value, param_list[i]) for i, template in optimized_templates]
+    ineffective_queries = [template(param_list[i]) for i, template in ineffective_templates]
 
     return optimized_queries, ineffective_queries
 
+def pick_delete_query(param_list, field_names, field_types, primary_key_name, primary_key_value, optimized):
+    """
+    Pick one random delete query, optimized or ineffective, building only that query.
+    Returns None if the inputs are invalid.
+    """
+    if not param_list or not field_names or not field_types or \
+       len(param_list) != len(field_names) or len(field_types) != len(field_names):
+        return None
+
+    optimized_templates, ineffective_templates = _delete_templates(tuple(field_names), tuple(field_types), primary_key_name)
+    if optimized:
+        i, template = random.choice(optimized_templates)
+        return template(primary_key_value, param_list[i])
+    i, template = random.choice(ineffective_templates)
+    return template(param_list[i])
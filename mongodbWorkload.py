@@ -32,6 +32,15 @@ if args.custom_queries and args.collections > 1:
     )
     args.collections = 1
 
+# Client-side bulk writes need MongoClient.bulk_write, which was added in pymongo 4.9
+if args.bulk_write_size > 1:
+    import pymongo # type: ignore
+    if not hasattr(pymongo.MongoClient, "bulk_write"):
+        logging.fatal(
+            f"Error: --bulk_write_size requires pymongo 4.9 or newer (installed: {pymongo.version})."
+        )
+        sys.exit(1)
+
 from logger import configure_logging
 # ---- SET LOGGING LEVEL AND CONFIGURE HANDLERS ----
 log_level = logging.DEBUG if args.debug else logging.INFO
@@ -305,9 +314,9 @@ def monitor_completion(completed_processes):
 # Make the call to start the workload
 # We use a slightly delayed start for each CPU to prevent some of the logging to get duplicated
 #####################################
-def delayed_start(args, process_id, completed_processes, output_queue, collection_queue, total_ops_dict, collection_def, created_collections, user_queries=None):
+def delayed_start(args, process_id, completed_processes, output_queue, collection_queue, total_ops_rates, collection_def, created_collections, user_queries=None):
     time.sleep(0.2)
-    return app.start_workload(args, process_id, completed_processes, output_queue, collection_queue, total_ops_dict, collection_def, created_collections, user_queries)
+    return app.start_workload(args, process_id, completed_processes, output_queue, collection_queue, total_ops_rates, collection_def, created_collections, user_queries)
 
 
 ###############################
@@ -390,26 +399,22 @@ if __name__ == "__main__":
         workload_logged = manager.Value('b', False)
         collection_logged = manager.Value('b', False)
 
-        total_ops_dict = manager.dict({
-            'insert': manager.list([0] * args.cpu),
-            'update': manager.list([0] * args.cpu),
-            'delete': manager.list([0] * args.cpu),
-            'select': manager.list([0] * args.cpu),
-        })
+        # Per-process (inserts, updates, deletes, selects) per-second rates in shared memory
+        total_ops_rates = app.SharedOpRates(args.cpu)
 
         lock = multiprocessing.Lock()
         stop_event = multiprocessing.Event()
 
         total_ops_logger = multiprocessing.Process(
             target=app.log_total_ops_per_interval,
-            args=(args, total_ops_dict, stop_event, lock)
+            args=(args, total_ops_rates, stop_event, lock)
         )
         total_ops_logger.start()
 
         # Launch workload in parallel
         parallel_executor = Parallel(n_jobs=args.cpu)
         parallel_executor(
-            delayed(delayed_start)(args, process_id, completed_processes, output_queue, collection_queue, total_ops_dict, collection_def, created_collections, user_queries)
+            delayed(delayed_start)(args, process_id, completed_processes, output_queue, collection_queue, total_ops_rates, collection_def, created_collections, user_queries)
             for process_id in range(args.cpu)
         )
 
@@ -420,6 +425,7 @@ if __name__ == "__main__":
             collection_output.append(collection_queue.get())
 
         monitor_completion(completed_processes)
+        total_ops_rates.close(unlink=True)
 
     # Summaries
     elapsed_time = time.time() - start_time